@@ -0,0 +1,229 @@
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, request
+
+from cache import add_cache_tags, page_cache
+from pagination import InvalidCursor, page_size
+from queries import (ARTIST_FIELDS, SHOW_FIELDS, VENUE_FIELDS, artist_detail,
+                     artist_listing, show_listing, venue_detail, venue_listing)
+import bookings
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is the fallback
+    orjson = None
+
+#----------------------------------------------------------------------------#
+# Read-only JSON API.
+#----------------------------------------------------------------------------#
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+DETAIL_FIELDS = ['upcoming_shows_count', 'past_shows_count',
+                 'upcoming_shows', 'past_shows']
+VENUE_DETAIL_FIELDS = [field for field in VENUE_FIELDS
+                       if field != 'num_upcoming_shows'] + DETAIL_FIELDS
+ARTIST_DETAIL_FIELDS = [field for field in ARTIST_FIELDS
+                        if field != 'num_upcoming_shows'] + DETAIL_FIELDS
+
+# Listing fields returned when ?fields= is not given.
+DEFAULT_FIELDS = {
+    'venues': ['id', 'name', 'city', 'state', 'num_upcoming_shows'],
+    'artists': ['id', 'name', 'city', 'state', 'num_upcoming_shows'],
+    'shows': SHOW_FIELDS,
+}
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def dumps(data):
+    """Serialize plain dicts, lists and datetimes to JSON bytes."""
+    if orjson is not None:
+        # column names are str subclasses, which orjson only takes as
+        # keys with OPT_NON_STR_KEYS
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(',', ':'),
+                      default=_isoformat).encode()
+
+
+def json_response(data, status=200):
+    return Response(dumps(data), status, mimetype='application/json')
+
+
+class ApiError(Exception):
+    """An error response: ``status`` and its JSON ``body``."""
+
+    def __init__(self, status, body):
+        super().__init__(status, body)
+        self.status = status
+        self.body = body
+
+
+def requested_fields(args, allowed, default=None):
+    """The ?fields= list, checked against ``allowed``; 400 if unknown."""
+    value = args.get('fields')
+    if not value:
+        return list(default or allowed)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        raise ApiError(400, {
+            "error": "unknown fields: " + (', '.join(unknown) or '(none)'),
+            "fields": allowed,
+        })
+    return fields
+
+
+def page_body(args, listing, fields, extra=(), session=None):
+    """
+    A keyset page of projected rows, trimmed to ``fields``; ``extra``
+    columns are selected for the view's own use but not returned.
+    """
+    try:
+        page = listing(after=args.get('after'),
+                       before=args.get('before'),
+                       limit=page_size(args.get('limit')),
+                       fields=fields + [name for name in extra
+                                        if name not in fields],
+                       session=session)
+    except InvalidCursor:
+        raise ApiError(400, {"error": "invalid cursor"})
+    return page, {
+        "data": [{field: row._mapping[field] for field in fields}
+                 for row in page],
+        "next": page.next_cursor,
+        "prev": page.prev_cursor,
+    }
+
+
+def detail_body(detail, entity_id, fields, session=None):
+    shows = 'upcoming_shows' in fields or 'past_shows' in fields
+    data = detail(entity_id, shows=shows, session=session)
+    if data is None:
+        raise ApiError(404, {"error": "not found"})
+    return data, {"data": {field: data[field] for field in fields}}
+
+
+#----------------------------------------------------------------------------#
+# Resources.
+#
+# Each takes the query arguments (and URL parameters) of a request and
+# returns its JSON body and the cache tags of the rows it shows. They only
+# touch the database through ``session``, so asgi.py serves the same
+# resources on its async engine.
+#----------------------------------------------------------------------------#
+
+
+def venues_resource(args, session=None):
+    fields = requested_fields(args, VENUE_FIELDS, DEFAULT_FIELDS['venues'])
+    page, body = page_body(args, venue_listing, fields, session=session)
+    return body, [f"venue:{row.id}" for row in page]
+
+
+def venue_resource(args, venue_id, session=None):
+    fields = requested_fields(args, VENUE_DETAIL_FIELDS)
+    data, body = detail_body(venue_detail, venue_id, fields, session)
+    shows = data.get("upcoming_shows", []) + data.get("past_shows", [])
+    return body, [f"artist:{show['artist_id']}" for show in shows]
+
+
+def artists_resource(args, session=None):
+    fields = requested_fields(args, ARTIST_FIELDS, DEFAULT_FIELDS['artists'])
+    page, body = page_body(args, artist_listing, fields, session=session)
+    return body, [f"artist:{row.id}" for row in page]
+
+
+def artist_resource(args, artist_id, session=None):
+    fields = requested_fields(args, ARTIST_DETAIL_FIELDS)
+    data, body = detail_body(artist_detail, artist_id, fields, session)
+    shows = data.get("upcoming_shows", []) + data.get("past_shows", [])
+    return body, [f"venue:{show['venue_id']}" for show in shows]
+
+
+def shows_resource(args, session=None):
+    fields = requested_fields(args, SHOW_FIELDS, DEFAULT_FIELDS['shows'])
+    page, body = page_body(args, show_listing, fields,
+                           extra=['venue_id', 'artist_id'], session=session)
+    return body, [tag for row in page for tag in
+                  (f"venue:{row.venue_id}", f"artist:{row.artist_id}")]
+
+
+def availability_resource(args, session=None):
+    """
+    Whether ?venue_id= and/or ?artist_id= are free from ?start= to ?end=
+    (ISO 8601), with the shows they are booked for otherwise.
+    """
+    invalid = ApiError(400, {"error": "start and end (ISO 8601, start "
+                                     "first) and a venue_id or artist_id "
+                                     "are required"})
+    try:
+        start = datetime.fromisoformat(args['start'])
+        end = datetime.fromisoformat(args['end'])
+        ids = {kind: int(args[f'{kind}_id']) if args.get(f'{kind}_id')
+               else None for kind in bookings.KEYS}
+    except (KeyError, ValueError):
+        raise invalid
+    if not start < end or not any(ids.values()):
+        raise invalid
+    found = bookings.conflicts(start, end, session=session,
+                               **{f'{kind}_id': entity_id
+                                  for kind, entity_id in ids.items()})
+    data = {"start": start, "end": end,
+            "free": not any(found.values())}
+    for kind, shows in found.items():
+        data[kind] = {"id": ids[kind], "free": not shows,
+                      "conflicts": [dict(show._mapping) for show in shows]}
+    return {"data": data}, []
+
+
+#----------------------------------------------------------------------------#
+# Views.
+#----------------------------------------------------------------------------#
+
+
+def respond(resource, **view_args):
+    try:
+        body, tags = resource(request.args, **view_args)
+    except ApiError as error:
+        return json_response(error.body, error.status)
+    add_cache_tags(*tags)
+    return json_response(body)
+
+
+@api.route('/venues')
+@page_cache.cached('venues')
+def venues():
+    return respond(venues_resource)
+
+
+@api.route('/venues/<int:venue_id>')
+@page_cache.cached('venue:{venue_id}')
+def venue(venue_id):
+    return respond(venue_resource, venue_id=venue_id)
+
+
+@api.route('/artists')
+@page_cache.cached('artists')
+def artists():
+    return respond(artists_resource)
+
+
+@api.route('/artists/<int:artist_id>')
+@page_cache.cached('artist:{artist_id}')
+def artist(artist_id):
+    return respond(artist_resource, artist_id=artist_id)
+
+
+@api.route('/shows')
+@page_cache.cached('shows')
+def shows():
+    return respond(shows_resource)
+
+
+# Checked before booking a show, so never served from the page cache.
+@api.route('/availability')
+def availability():
+    return respond(availability_resource)
@@ -0,0 +1,183 @@
+import sys
+
+from flask import (Blueprint, abort, flash, jsonify, redirect,
+                   render_template, request, url_for)
+
+from cache import add_cache_tags, page_cache
+from facets import InvalidFilter, parse_filters
+from models import db, Artist
+from pagination import InvalidCursor
+from queries import artist_detail, artist_listing
+from templating import stream_template
+from views import browse_facets, page_args, tagged_shows
+import loading
+import lookups
+import routing
+import search
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+# The form views import forms (and with it WTForms) when first called, so
+# starting a worker or a CLI command doesn't.
+blueprint = Blueprint('artists', __name__)
+
+
+@blueprint.route('/artists')
+@page_cache.cached('artists')
+def artists():
+    # browse by ?genre=&state=&city=, with counts for each facet value
+    try:
+        filters = parse_filters(request.args)
+        page = artist_listing(**page_args(), filters=filters)
+    except (InvalidCursor, InvalidFilter):
+        abort(400)
+    add_cache_tags(*(f"artist:{artist.id}" for artist in page))
+
+    return render_template('pages/artists.html', artists=page, page=page,
+                           facets=browse_facets(Artist, filters))
+
+
+#  Search Artist
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/artists/search', methods=['POST'])
+@routing.read_only
+def search_artists():
+    """
+    ranked, case-insensitive fuzzy search on artist name, city and genre.
+    """
+    query = request.form.get('search_term', '')
+    result = search.search_artists(query, request.form.get('limit'))
+
+    response = {"count": len(result), "data": result}
+
+    return render_template('pages/search_artists.html',
+                           results=response,
+                           search_term=query)
+
+
+@blueprint.route('/artists/typeahead')
+def typeahead_artists():
+    result = search.search_artists(request.args.get('q', ''),
+                                   request.args.get('limit'))
+    return jsonify(search.typeahead_response(result))
+
+
+@blueprint.route('/artists/choices')
+def artist_choices():
+    return jsonify(lookups.choices_response(lookups.artists.search(
+        request.args.get('q'), search.clamp_limit(request.args.get('limit')))))
+
+
+@blueprint.route('/artists/<int:artist_id>')
+@page_cache.cached('artist:{artist_id}')
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    artist = artist_detail(artist_id)
+    if artist is None:
+        abort(404)
+    for shows in ("upcoming_shows", "past_shows"):
+        artist[shows] = tagged_shows(artist[shows], 'venue')
+
+    return stream_template('pages/show_artist.html', artist=artist)
+
+
+#  Update Artist
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@routing.read_primary
+def edit_artist(artist_id):
+    from forms import ArtistForm
+
+    try:
+        artist = Artist.query.options(
+            *loading.profile(Artist, 'bare')).get_or_404(artist_id)
+
+        form = ArtistForm(obj=artist)
+        return render_template('forms/edit_artist.html',
+                               form=form,
+                               artist=artist)
+    except:
+        flash(f"Artist ({artist.id}) failed to fetch")
+
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    from forms import ArtistForm
+
+    form = ArtistForm(request.form)
+    try:
+        if form.validate():
+            form_data = form.data
+            form_data.pop('csrf_token', None)
+            artist = db.session.query(Artist).filter_by(id=artist_id)
+
+            if not artist.first():
+                abort(404)
+            artist.update(form_data)
+
+            db.session.commit()
+            page_cache.invalidate('artists', f"artist:{artist_id}")
+            lookups.artists.invalidate()
+            flash("Artist successfully updated!")
+        else:
+            print("errors: ", form.errors)
+            flash("Form validation failed .Artist could not be updated")
+            return render_template('forms/new_artist.html', form=form)
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+        flash('An error occurred. artist could not be updated.')
+        return render_template('forms/new_artist.html', form=form)
+    finally:
+        db.session.close()
+
+    return redirect(url_for('.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    from forms import ArtistForm
+
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@blueprint.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    from forms import ArtistForm
+
+    form = ArtistForm(request.form)
+    try:
+        if form.validate():
+            form_data = form.data
+            form_data.pop('csrf_token', None)
+            venue = Artist(**form_data)
+            db.session.add(venue)
+            db.session.commit()
+            page_cache.invalidate('artists')
+            lookups.artists.invalidate()
+            flash("Artist was successfully created!")
+        else:
+            print("errors: ", form.errors)
+            flash("Form validation failed. Artist could not be created")
+            return render_template('forms/new_artist.html', form=form)
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+        flash('An error occurred. Artist could not be created.')
+        return render_template('forms/new_artist.html', form=form)
+    finally:
+        db.session.close()
+    return redirect(url_for('.artists'))
@@ -0,0 +1,164 @@
+"""
+ASGI entry point.
+
+The read-only JSON routes (the /api/v1 listings, detail pages and
+availability checks, and the typeahead searches) run as coroutines on an
+asyncpg engine: a request waiting on the database holds a pooled
+connection but no thread, so a slow database queues requests on the pool
+rather than running a worker out of threads. Every other route is the
+Flask app, served from a thread pool as under a WSGI server.
+
+    uvicorn asgi:app --workers 4
+"""
+import asyncio
+import re
+from collections import namedtuple
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from werkzeug.datastructures import MultiDict
+
+import api
+import instrumentation
+import search
+from app import create_app
+from cache import CachedPage, page_cache, page_key
+
+#----------------------------------------------------------------------------#
+# Async read routes.
+#----------------------------------------------------------------------------#
+
+# ``endpoint`` names the Flask view serving the same response, so both
+# share page cache entries; None leaves the route uncached, as in Flask.
+Route = namedtuple('Route', ['pattern', 'endpoint', 'resource', 'tags'])
+
+
+def _typeahead(search_function):
+    def resource(args, session=None):
+        rows = search_function(args.get('q', ''), args.get('limit'),
+                               session=session)
+        return search.typeahead_response(rows), []
+    return resource
+
+
+READ_ROUTES = [
+    Route(r'/api/v1/venues', 'api.venues', api.venues_resource,
+          ['venues']),
+    Route(r'/api/v1/venues/(?P<venue_id>\d+)', 'api.venue',
+          api.venue_resource, ['venue:{venue_id}']),
+    Route(r'/api/v1/artists', 'api.artists', api.artists_resource,
+          ['artists']),
+    Route(r'/api/v1/artists/(?P<artist_id>\d+)', 'api.artist',
+          api.artist_resource, ['artist:{artist_id}']),
+    Route(r'/api/v1/shows', 'api.shows', api.shows_resource, ['shows']),
+    Route(r'/api/v1/availability', None, api.availability_resource, []),
+    Route(r'/venues/typeahead', None, _typeahead(search.search_venues), []),
+    Route(r'/artists/typeahead', None, _typeahead(search.search_artists),
+          []),
+]
+
+
+def async_database_url(url):
+    """``url`` with its driver swapped for asyncpg."""
+    return make_url(url).set(drivername='postgresql+asyncpg')
+
+
+async def _send_json(send, status, body, cache=None):
+    headers = [(b'content-type', b'application/json'),
+               (b'content-length', str(len(body)).encode())]
+    if cache is not None:
+        headers.append((b'x-cache', cache.encode()))
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _cache_lookup(key):
+    """
+    The cached page under ``key``; on a miss, None and the cache
+    generation to store the rendered page with.
+    """
+    page = page_cache.get(key)
+    if page is not None:
+        return page, None
+    return None, page_cache.backend.generation()
+
+
+class AsyncReads:
+    """
+    Serve ``routes`` on the asyncio engine and hand every other request
+    to ``wsgi_app``; with no routes it is the plain threaded Flask app.
+
+    The route resources are the same synchronous functions the Flask
+    views call. They run through ``AsyncSession.run_sync``, which awaits
+    asyncpg under the hood, so the SQL and the responses are the same in
+    both modes. The page cache is synchronous too (the SQLite backend
+    waits on its file lock), so it is read and written from threads.
+    """
+
+    def __init__(self, wsgi_app, routes=READ_ROUTES):
+        config = wsgi_app.config
+        self.engine = create_async_engine(
+            async_database_url(config['SQLALCHEMY_DATABASE_URI']),
+            **config['ASYNC_SQLALCHEMY_ENGINE_OPTIONS'])
+        instrumentation.instrument_engine(self.engine.sync_engine)
+        self.sessions = sessionmaker(self.engine, class_=AsyncSession)
+        self.routes = [(re.compile(route.pattern), route) for route in routes]
+        self.fallback = WSGIMiddleware(wsgi_app,
+                                       workers=config['ASGI_WSGI_THREADS'])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            for pattern, route in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match:
+                    view_args = {name: int(value) for name, value
+                                 in match.groupdict().items()}
+                    return await self.read(route, view_args, scope, send)
+        await self.fallback(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read(self, route, view_args, scope, send):
+        args = MultiDict(parse_qsl(scope['query_string'].decode(),
+                                   keep_blank_values=True))
+        key = None
+        if route.endpoint is not None and page_cache.backend is not None:
+            key = page_key(route.endpoint, view_args, args.items(multi=True))
+            page, generation = await asyncio.to_thread(_cache_lookup, key)
+            if page is not None:
+                return await _send_json(send, page.status, page.body, 'HIT')
+
+        try:
+            async with self.sessions() as session:
+                body, tags = await session.run_sync(
+                    lambda sync_session: route.resource(
+                        args, session=sync_session, **view_args))
+        except api.ApiError as error:
+            return await _send_json(send, error.status,
+                                    api.dumps(error.body))
+
+        body = api.dumps(body)
+        if key is None:
+            return await _send_json(send, 200, body)
+        await asyncio.to_thread(
+            page_cache.put, key, CachedPage(body, 200, 'application/json'),
+            {tag.format(**view_args) for tag in route.tags} | set(tags),
+            generation)
+        await _send_json(send, 200, body, 'MISS')
+
+
+app = AsyncReads(create_app())
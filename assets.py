@@ -0,0 +1,213 @@
+import glob
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # optional; without it only .gz variants are written
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# Static assets.
+#----------------------------------------------------------------------------#
+
+# Bundles the layouts load, in order, from files under static/. Bundles
+# are written to static/dist, as deep as static/css, so relative url()s
+# in the stylesheets still resolve.
+BUNDLES = {
+    'site.css': ['css/bootstrap.min.css', 'css/layout.main.css',
+                 'css/main.css', 'css/main.responsive.css',
+                 'css/main.quickfix.css'],
+    'head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+    'site.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js',
+                'js/plugins.js'],
+}
+# Files given fingerprinted copies as they are.
+FILES = ['img/*.jpg', 'favicon/*']
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ico', '.json', '.webmanifest'}
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}  # in order of preference
+
+_CSS_SKIP = re.compile(r'''("(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|'''
+                       r'''/\*.*?\*/)''', re.S)
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def _minify_css_code(code):
+    # spaces around a colon are left: in a selector, "a :hover" and
+    # "a:hover" match different elements
+    code = _CSS_PUNCTUATION.sub(r'\1', re.sub(r'\s+', ' ', code))
+    return code.replace(';}', '}')
+
+
+def minify_css(css):
+    """
+    Drop comments (but /*! licences) and the whitespace CSS doesn't need,
+    leaving strings alone.
+    """
+    parts, code = [], []
+
+    def flush():
+        text = _minify_css_code(''.join(code))
+        parts.append(text.lstrip() if parts and parts[-1].endswith('\n')
+                     else text)
+        code.clear()
+
+    for index, part in enumerate(_CSS_SKIP.split(css)):
+        if index % 2 == 0:
+            code.append(part)
+        elif part.startswith('/*') and not part.startswith('/*!'):
+            code.append(' ')
+        else:
+            flush()
+            parts.append(part + '\n' if part.startswith('/*!') else part)
+    flush()
+    return ''.join(parts).strip()
+
+
+def minify_js(js):
+    """
+    Drop blank lines, indentation and whole-line // comments. Line breaks
+    stay, so automatic semicolon insertion reads the code as before.
+    """
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines
+                     if line and not line.startswith('//'))
+
+
+def bundle(static_folder, files):
+    """The minified contents of ``files``, concatenated."""
+    parts = []
+    for name in files:
+        with open(os.path.join(static_folder, name), encoding='utf-8') as file:
+            source = file.read()
+        if '.min.' in name:
+            parts.append(source.strip())
+        elif name.endswith('.css'):
+            parts.append(minify_css(source))
+        else:
+            parts.append(minify_js(source))
+    separator = '\n' if files[0].endswith('.css') else ';\n'
+    return (separator.join(parts) + '\n').encode('utf-8')
+
+
+def _write(path, data):
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def write_asset(static_folder, name, data):
+    """
+    Write ``data`` as dist/<name stem>.<content hash><extension>, with
+    compressed variants where they are smaller; its manifest entry.
+    """
+    directory, basename = os.path.split(name)
+    stem, extension = os.path.splitext(basename)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    filename = '/'.join(filter(None, [DIST, directory,
+                                      f'{stem}.{digest}{extension}']))
+    path = os.path.join(static_folder, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write(path, data)
+
+    variants = {}
+    if extension in COMPRESSIBLE:
+        variants['gzip'] = gzip.compress(data, 9, mtime=0)
+        if brotli is not None:
+            variants['br'] = brotli.compress(data, quality=11)
+    encodings = []
+    for encoding, suffix in ENCODINGS.items():
+        compressed = variants.get(encoding)
+        if compressed is not None and len(compressed) < len(data):
+            _write(path + suffix, compressed)
+            encodings.append(encoding)
+    return {'file': filename, 'size': len(data), 'encodings': encodings,
+            'compressed': {encoding: len(variants[encoding])
+                           for encoding in encodings}}
+
+
+def build(static_folder):
+    """
+    Write every bundle and file to static/dist and the manifest mapping
+    their names to the fingerprinted files. Earlier builds are left in
+    place for pages still referring to them, e.g. from the page cache.
+    """
+    manifest = {}
+    for name, files in BUNDLES.items():
+        manifest[name] = write_asset(static_folder, name,
+                                     bundle(static_folder, files))
+    for pattern in FILES:
+        for path in sorted(glob.glob(os.path.join(static_folder, pattern))):
+            name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            with open(path, 'rb') as file:
+                manifest[name] = write_asset(static_folder, name, file.read())
+    _write(os.path.join(static_folder, DIST, MANIFEST),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def init_app(app):
+    """
+    With ASSETS_BUNDLED and a built manifest (`flask assets`), static URLs
+    point at fingerprinted files, which are served precompressed and
+    cached for ASSETS_MAX_AGE; otherwise the source files are used.
+    """
+    manifest = load_manifest(app.static_folder) \
+        if app.config.get('ASSETS_BUNDLED', True) else {}
+    if app.config.get('ASSETS_BUNDLED', True) and not manifest:
+        app.logger.warning('no static asset manifest; run `flask assets`')
+    app.extensions['assets'] = manifest
+
+    @app.template_global()
+    def asset_urls(name):
+        """URLs of a bundle: the built file, or else its sources."""
+        if name in manifest:
+            return [url_for('static', filename=name)]
+        return [url_for('static', filename=source)
+                for source in BUNDLES[name]]
+
+    @app.url_defaults
+    def fingerprint(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]['file']
+
+    built = {entry['file']: entry['encodings'] for entry in manifest.values()}
+    send_static_file = app.view_functions['static']
+    max_age = app.config.get('ASSETS_MAX_AGE', 365 * 24 * 3600)
+
+    def static(filename):
+        encodings = built.get(filename)
+        if encodings is None:
+            return send_static_file(filename=filename)
+        encoding = next((encoding for encoding in encodings
+                         if request.accept_encodings[encoding]), None)
+        path = filename + ENCODINGS.get(encoding, '')
+        # the name carries the content hash: a strong validator already
+        response = send_from_directory(
+            app.static_folder, path, etag=os.path.basename(path),
+            mimetype=mimetypes.guess_type(filename)[0] or
+            'application/octet-stream', max_age=max_age)
+        response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
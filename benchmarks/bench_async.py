@@ -0,0 +1,255 @@
+"""
+Compare request throughput of the async read routes (asgi.py) against
+the same routes served by Flask on threads, at increasing concurrency.
+
+    FYYUR_CONFIG=test python -m benchmarks.dataset --truncate   # once
+    python -m benchmarks.bench_async [--requests 500] [--threads 10]
+                                     [--concurrency 1 --concurrency 16 ...]
+                                     [--output FILE]
+
+Both modes are the ASGI app of asgi.py, driven in process without a
+socket: "sync" hands every request to the Flask app on ``--threads``
+threads, as a threaded WSGI server would; "async" answers the read
+routes on the asyncpg engine. Each request is a listing, detail page or
+typeahead search of the generated dataset. The page cache is disabled.
+
+``--latency-ms`` routes both modes' database connections through a local
+proxy adding that round trip time, standing in for a database that is
+further away or slowed down.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+
+# The database benchmarks.dataset fills; the test config doesn't sample
+# SQL either, which would time the logging, not the views.
+os.environ.setdefault('FYYUR_CONFIG', 'test')
+
+from benchmarks.bench_routes import RESULTS_DIR, _git  # noqa: E402
+
+CONCURRENCY = [1, 4, 16, 64]
+
+
+async def _pipe(reader, writer, delay):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            await asyncio.sleep(delay)
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def latency_proxy(url, latency_ms):
+    """
+    Start a TCP proxy to the database of ``url`` delaying traffic by
+    ``latency_ms`` per round trip, on a thread of its own; the URL to
+    connect through it.
+    """
+    from sqlalchemy.engine import make_url
+
+    url = make_url(url)
+    host, port = url.query.get('host') or url.host, url.port or 5432
+    delay = latency_ms / 2e3
+    loop = asyncio.new_event_loop()
+
+    async def connect():
+        if host and host.startswith('/'):
+            return await asyncio.open_unix_connection(
+                f'{host}/.s.PGSQL.{port}')
+        return await asyncio.open_connection(host or 'localhost', port)
+
+    async def handle(client_reader, client_writer):
+        server_reader, server_writer = await connect()
+        await asyncio.gather(_pipe(client_reader, server_writer, delay),
+                             _pipe(server_reader, client_writer, delay))
+
+    server = loop.run_until_complete(
+        asyncio.start_server(handle, '127.0.0.1', 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    proxy_port = server.sockets[0].getsockname()[1]
+    return str(url.difference_update_query(['host']).set(
+        host='127.0.0.1', port=proxy_port))
+
+
+def request_paths(app, count, seed=1):
+    """``count`` read requests over random venues, artists and names."""
+    from models import db, Artist, Venue
+
+    with app.app_context():
+        venues = [id for id, in db.session.query(Venue.id)]
+        artists = [id for id, in db.session.query(Artist.id)]
+        names = [name for name, in db.session.query(Venue.name).limit(200)]
+        db.session.remove()
+    if not venues or not artists:
+        sys.exit('No venues or artists; run benchmarks.dataset first.')
+
+    rng = random.Random(seed)
+    kinds = [
+        lambda: '/api/v1/venues',
+        lambda: '/api/v1/artists',
+        lambda: '/api/v1/shows',
+        lambda: f'/api/v1/venues/{rng.choice(venues)}',
+        lambda: f'/api/v1/artists/{rng.choice(artists)}',
+        lambda: f'/venues/typeahead?q={rng.choice(names).split()[0][:4]}',
+    ]
+    return [rng.choice(kinds)() for _ in range(count)]
+
+
+async def _get(app, path):
+    """Run one GET through the ASGI ``app``; its status code."""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path,
+        'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80), 'client': ('127.0.0.1', 50000),
+    }
+    done = asyncio.Event()
+    status = None
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif not message.get('more_body'):
+            done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return status
+
+
+async def run_load(app, paths, concurrency):
+    """
+    Send ``paths`` through ``app`` from ``concurrency`` clients; seconds
+    taken, per request latencies and the number of non-200 responses.
+    """
+    queue = list(reversed(paths))
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        while queue:
+            path = queue.pop()
+            start = time.perf_counter()
+            if await _get(app, path) != 200:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def _summary(seconds, latencies, errors):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'seconds': round(seconds, 3),
+        'rps': round(len(latencies) / seconds, 1),
+        'median_ms': round(statistics.median(latencies) * 1e3, 3),
+        'p95_ms': round(statistics.quantiles(latencies, n=20)[-1] * 1e3, 3),
+        'errors': errors,
+    }
+
+
+async def bench(modes, paths, concurrency, warmup):
+    results = {name: {} for name in modes}
+    for name, app in modes.items():
+        await run_load(app, paths[:warmup], min(warmup, max(concurrency)))
+    for clients in concurrency:
+        for name, app in modes.items():
+            result = _summary(*await run_load(app, paths, clients))
+            results[name][clients] = result
+            print(f'{name:<6} {clients:4d} clients {result["rps"]:9.1f} req/s '
+                  f'{result["median_ms"]:9.2f} ms median '
+                  f'{result["p95_ms"]:9.2f} ms p95 '
+                  f'{result["errors"]:4d} errors')
+    for app in modes.values():
+        await app.engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500,
+                        help='requests per mode and concurrency level')
+    parser.add_argument('--concurrency', type=int, action='append',
+                        help=f'concurrent clients (default: {CONCURRENCY})')
+    parser.add_argument('--threads', type=int,
+                        help='Flask threads (default: ASGI_WSGI_THREADS)')
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='database round trip time to add')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='results file (default: '
+                        'benchmarks/results/async-<commit>.json)')
+    args = parser.parse_args()
+
+    from app import create_app
+    from cache import page_cache
+
+    app = create_app()
+
+    if args.threads:
+        app.config['ASGI_WSGI_THREADS'] = args.threads
+    if args.latency_ms:
+        app.config['SQLALCHEMY_DATABASE_URI'] = latency_proxy(
+            app.config['SQLALCHEMY_DATABASE_URI'], args.latency_ms)
+    page_cache.backend = None
+
+    from asgi import AsyncReads
+
+    concurrency = args.concurrency or CONCURRENCY
+    paths = request_paths(app, args.requests, args.seed)
+    modes = {'sync': AsyncReads(app, routes=()), 'async': AsyncReads(app)}
+    results = asyncio.run(bench(modes, paths, concurrency, args.warmup))
+
+    commit = _git('rev-parse', '--short', 'HEAD')
+    report = {
+        'commit': commit,
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'threads': app.config['ASGI_WSGI_THREADS'],
+        'latency_ms': args.latency_ms,
+        'async_pool': app.config['ASYNC_SQLALCHEMY_ENGINE_OPTIONS'],
+        'results': results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'async-{commit or "unknown"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2, default=str)
+    print(f'\nresults written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Cost of checking whether a venue and an artist are free, against a
+table of a million shows.
+
+    FYYUR_CONFIG=test python -m benchmarks.dataset --truncate --shows 1000000
+    python -m benchmarks.bench_bookings [--checks 2000] [--scan-sample 20]
+
+Each check asks about a random two-hour window of the dataset's span
+for the busiest venue and artist, the worst case for both:
+
+- "indexed": bookings.conflicts, one range of the (venue_id,
+  start_time) and (artist_id, start_time) indexes each;
+- "scan": the check as app code would do it without the index bound,
+  loading all the venue's and artist's shows and comparing each (timed
+  on a sample).
+
+The plan of the indexed venue query follows, with the buffers it reads.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+# the database benchmarks.dataset fills
+os.environ.setdefault('FYYUR_CONFIG', 'test')
+
+WINDOW = timedelta(hours=2)
+
+
+def scan_conflicts(start, end, venue_id, artist_id):
+    from models import db, Show
+
+    found = {}
+    for kind, key, entity_id in (('venue', Show.venue_id, venue_id),
+                                 ('artist', Show.artist_id, artist_id)):
+        shows = db.session.query(Show.id, Show.start_time, Show.duration) \
+            .filter(key == entity_id).all()
+        found[kind] = [show for show in shows if show.start_time < end
+                       and start < show.start_time + show.duration]
+    return found
+
+
+def timed(check, windows, venue_id, artist_id):
+    timings, busy = [], 0
+    for start in windows:
+        began = time.perf_counter()
+        found = check(start, start + WINDOW, venue_id, artist_id)
+        timings.append(time.perf_counter() - began)
+        busy += any(found.values())
+    return timings, busy
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checks', type=int, default=2000)
+    parser.add_argument('--scan-sample', type=int, default=20,
+                        help='checks timed through the full scan')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    from app import create_app
+    from bookings import conflicts, overlap_query
+    from models import db, Show
+
+    app = create_app()
+    with app.app_context():
+        shows, first, last = db.session.query(
+            db.func.count(Show.id), db.func.min(Show.start_time),
+            db.func.max(Show.start_time)).one()
+        if not shows:
+            sys.exit('No shows in the database; run benchmarks.dataset first.')
+        busiest = {
+            name: db.session.query(column, db.func.count()).group_by(
+                column).order_by(db.func.count().desc()).first()
+            for name, column in (('venue', Show.venue_id),
+                                 ('artist', Show.artist_id))}
+        venue_id, venue_shows = busiest['venue']
+        artist_id, artist_shows = busiest['artist']
+        print(f'{shows} shows; venue {venue_id} has {venue_shows}, '
+              f'artist {artist_id} {artist_shows}')
+
+        generator = random.Random(args.seed)
+        span = (last - first).total_seconds()
+        windows = [first + timedelta(seconds=generator.uniform(0, span))
+                   for _ in range(args.checks)]
+        cases = [
+            ('indexed', conflicts, windows),
+            ('scan', scan_conflicts, windows[:args.scan_sample]),
+        ]
+        for name, check, sample in cases:
+            check(sample[0], sample[0] + WINDOW, venue_id, artist_id)
+            timings, busy = timed(check, sample, venue_id, artist_id)
+            print(f'{name:<8} {len(sample):6d} checks '
+                  f'{statistics.median(timings) * 1e3:8.3f} ms median '
+                  f'{sorted(timings)[int(len(timings) * 0.95)] * 1e3:8.3f}'
+                  f' ms p95  {busy / len(sample):6.1%} busy')
+
+        statement = overlap_query('venue', venue_id, windows[0],
+                                  windows[0] + WINDOW).statement.compile(
+                                      db.engine)
+        plan = db.session.connection().exec_driver_sql(
+            f'EXPLAIN (ANALYZE, BUFFERS, COSTS OFF) {statement}',
+            statement.params)
+        print('\nindexed venue query:')
+        for line, in plan:
+            print('  ' + line)
+
+
+if __name__ == '__main__':
+    main()
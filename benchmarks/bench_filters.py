@@ -0,0 +1,54 @@
+"""
+Per-row cost of formatting show times on a 10k-show artist page.
+
+    python -m benchmarks.bench_filters [--rows 10000] [--repeat 5]
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from filters import format_datetime, format_datetimes
+
+
+def legacy_format_datetime(value, format='medium'):
+    """The filter as it was: parse a string, then format through babel."""
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    start = datetime(2021, 1, 1, 20, 0)
+    times = [start + timedelta(hours=6 * i) for i in range(args.rows)]
+
+    cases = {
+        # view formatted str(start_time), the template re-parsed it as 'full'
+        'legacy (view + template)': lambda: [
+            legacy_format_datetime(legacy_format_datetime(str(time)), 'full')
+            for time in times],
+        'legacy (single pass)': lambda: [
+            legacy_format_datetime(str(time), 'full') for time in times],
+        'format_datetime': lambda: [
+            format_datetime(time, 'full') for time in times],
+        'format_datetimes': lambda: format_datetimes(times, 'full'),
+    }
+    print(f'{args.rows} rows, best of {args.repeat}')
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        print(f'{name:<26} {best * 1e3:9.1f} ms  '
+              f'{best / args.rows * 1e6:7.2f} us/row')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+Time every route through the Flask test client against the test
+database, and store the results as JSON for comparison between commits.
+
+    FYYUR_CONFIG=test python -m benchmarks.dataset --truncate   # once
+    python -m benchmarks.bench_routes [--repeat 20] [--only venues]
+                                      [--output FILE] [--compare FILE]
+
+The write routes add rows, and every row above the ids found at the
+start is deleted at the end, so it only runs with the test config and
+TEST_DATABASE_URL set. The page cache is disabled (``--cache`` keeps
+it) so views hit the database every time.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+os.environ.setdefault('FYYUR_CONFIG', 'test')
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+Case = namedtuple('Case', ['name', 'method', 'path', 'data', 'headers'],
+                  defaults=[None])
+# set on the app for the cache_stats case
+STATS_TOKEN = 'bench'
+
+
+def _venue_form(name):
+    return {'name': name, 'city': 'Austin', 'state': 'TX',
+            'address': '1 Congress Ave', 'phone': '512-555-0100',
+            'genres': ['Jazz', 'Blues'], 'seeking_talent': 'y',
+            'seeking_description': 'benchmark'}
+
+
+def _artist_form(name):
+    return {'name': name, 'city': 'Austin', 'state': 'TX',
+            'phone': '512-555-0101', 'genres': ['Jazz'],
+            'seeking_venue': 'y', 'seeking_description': 'benchmark'}
+
+
+def cases(ids):
+    """
+    The benchmarked requests. Paths and form data are callables of the
+    iteration number so write routes touch a fresh row each time.
+    """
+    venue, artist = ids['venue'], ids['artist']
+    start = datetime.now() + timedelta(days=30)
+    return [
+        Case('index', 'GET', '/', None),
+        Case('venues', 'GET', '/venues', None),
+        Case('venues_search', 'POST', '/venues/search',
+             {'search_term': 'blue'}),
+        Case('venues_typeahead', 'GET', '/venues/typeahead?q=velv', None),
+        Case('venues_choices', 'GET', '/venues/choices?q=hall', None),
+        Case('venue_detail', 'GET', f'/venues/{venue}', None),
+        Case('venue_create_form', 'GET', '/venues/create', None),
+        Case('venue_edit_form', 'GET', f'/venues/{venue}/edit', None),
+        Case('artists', 'GET', '/artists', None),
+        Case('artists_search', 'POST', '/artists/search',
+             {'search_term': 'jazz'}),
+        Case('artists_typeahead', 'GET', '/artists/typeahead?q=fox', None),
+        Case('artists_choices', 'GET', '/artists/choices?q=the', None),
+        Case('artist_detail', 'GET', f'/artists/{artist}', None),
+        Case('artist_create_form', 'GET', '/artists/create', None),
+        Case('artist_edit_form', 'GET', f'/artists/{artist}/edit', None),
+        Case('shows', 'GET', '/shows', None),
+        Case('show_create_form', 'GET', '/shows/create', None),
+        Case('cache_stats', 'GET', '/cache/stats', None,
+             {'Authorization': f'Bearer {STATS_TOKEN}'}),
+        Case('venue_create', 'POST', '/venues/create',
+             lambda i: _venue_form(f'Bench Venue {i}')),
+        Case('venue_edit', 'POST',
+             lambda i: f'/venues/{ids["created_venues"]()[i]}/edit',
+             lambda i: _venue_form(f'Bench Venue {i} (edited)')),
+        Case('artist_create', 'POST', '/artists/create',
+             lambda i: _artist_form(f'Bench Artist {i}')),
+        Case('artist_edit', 'POST',
+             lambda i: f'/artists/{ids["created_artists"]()[i]}/edit',
+             lambda i: _artist_form(f'Bench Artist {i} (edited)')),
+        # a day apart, so no show conflicts with the previous run's
+        Case('show_create', 'POST', '/shows/create',
+             lambda i: {'venue_id': venue, 'artist_id': artist,
+                        'start_time': (start + timedelta(days=i)).strftime(
+                            '%Y-%m-%d %H:%M:%S')}),
+        # each run deletes the oldest venue venue_create left behind
+        Case('venue_delete', 'POST',
+             lambda i: f'/venues/{ids["created_venues"]()[0]}', None),
+    ]
+
+
+def _summary(timings, queries, status):
+    timings = sorted(timings)
+    return {
+        'runs': len(timings),
+        'min_ms': round(timings[0] * 1e3, 3),
+        'median_ms': round(statistics.median(timings) * 1e3, 3),
+        'p95_ms': round((statistics.quantiles(timings, n=20)[-1]
+                         if len(timings) > 1 else timings[0]) * 1e3, 3),
+        'mean_ms': round(statistics.fmean(timings) * 1e3, 3),
+        'queries': queries,
+        'status': status,
+    }
+
+
+def run(app, repeat, only=(), warmup=1):
+    from instrumentation import record_queries
+    from models import db, Artist, Show, Venue
+
+    with app.app_context():
+        baseline = {model: db.session.query(
+            db.func.coalesce(db.func.max(model.id), 0)).scalar()
+            for model in (Venue, Artist, Show)}
+        dataset = {model.__tablename__.lower() + 's': db.session.query(
+            db.func.count(model.id)).scalar()
+            for model in (Venue, Artist, Show)}
+        # the busiest venue and artist make the detail pages worst cases
+        busiest = {
+            name: db.session.query(column).group_by(column).order_by(
+                db.func.count().desc()).limit(1).scalar()
+            for name, column in (('venue', Show.venue_id),
+                                 ('artist', Show.artist_id))}
+        db.session.remove()
+    if not busiest['venue'] or not busiest['artist']:
+        sys.exit('No shows in the database; run benchmarks.dataset first.')
+
+    def created(model):
+        with app.app_context():
+            ids = [id for id, in db.session.query(model.id).filter(
+                model.id > baseline[model]).order_by(model.id)]
+            db.session.remove()
+            return ids
+
+    ids = dict(busiest, created_venues=lambda: created(Venue),
+               created_artists=lambda: created(Artist))
+    client = app.test_client()
+    results = {}
+    try:
+        for case in cases(ids):
+            if only and not any(name in case.name for name in only):
+                continue
+            timings, queries, status = [], None, None
+            try:
+                first_path = case.path(0) if callable(case.path) else case.path
+            except IndexError:
+                print(f'{case.name:<20} skipped: run the matching create case')
+                continue
+            for i in range(warmup + repeat):
+                path = case.path(i) if callable(case.path) else case.path
+                data = case.data(i) if callable(case.data) else case.data
+                with record_queries() as recorded:
+                    start = time.perf_counter()
+                    # buffered: streamed pages render as their body is read
+                    response = client.open(path, method=case.method,
+                                           data=data, headers=case.headers,
+                                           buffered=True)
+                    elapsed = time.perf_counter() - start
+                if response.status_code >= 500:
+                    raise RuntimeError(f'{case.method} {path}: '
+                                       f'{response.status_code}')
+                if i >= warmup:
+                    timings.append(elapsed)
+                    queries, status = recorded.count, response.status_code
+            results[case.name] = dict(_summary(timings, queries, status),
+                                      method=case.method, path=first_path)
+            print(f'{case.name:<20} {results[case.name]["median_ms"]:9.2f} ms '
+                  f'median {results[case.name]["p95_ms"]:9.2f} ms p95 '
+                  f'{queries:4d} queries')
+    finally:
+        with app.app_context():
+            for model in (Show, Artist, Venue):
+                model.query.filter(model.id > baseline[model]).delete()
+            db.session.commit()
+            db.session.remove()
+    return dataset, results
+
+
+def _git(*args):
+    try:
+        return subprocess.run(('git',) + args, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new, threshold):
+    """Print median changes against ``old``; the regressed route names."""
+    regressions = []
+    print(f'\nagainst {old.get("commit") or "?"} ({old.get("timestamp")})')
+    for name, result in new['results'].items():
+        before = old['results'].get(name)
+        if before is None:
+            print(f'{name:<20} new')
+            continue
+        change = result['median_ms'] / before['median_ms'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<20} {before["median_ms"]:9.2f} -> '
+              f'{result["median_ms"]:9.2f} ms {change:+7.1%} '
+              f'queries {before["queries"]} -> {result["queries"]}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--only', action='append', default=[],
+                        help='run only cases whose name contains this')
+    parser.add_argument('--cache', action='store_true',
+                        help='keep the page cache enabled')
+    parser.add_argument('--output', help='results file (default: '
+                        'benchmarks/results/routes-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='median slowdown reported as a regression')
+    args = parser.parse_args()
+
+    from app import create_app
+    from cache import page_cache
+
+    app = create_app()
+    if not app.testing or not os.environ.get('TEST_DATABASE_URL'):
+        sys.exit('bench_routes deletes the rows it adds: run it with the '
+                 'test config and TEST_DATABASE_URL set.')
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['CACHE_STATS_TOKEN'] = STATS_TOKEN
+    if not args.cache:
+        page_cache.backend = None
+
+    dataset, results = run(app, args.repeat, args.only)
+    commit = _git('rev-parse', '--short', 'HEAD')
+    report = {
+        'commit': commit,
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'cache': args.cache,
+        'dataset': dataset,
+        'results': results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'routes-{commit or "unknown"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'\nresults written to {output}')
+
+    if args.compare:
+        with open(args.compare) as file:
+            if compare(json.load(file), report, args.threshold):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
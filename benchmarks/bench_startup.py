@@ -0,0 +1,124 @@
+"""
+Cold start of the app: how long a new process takes to import app.py and
+build the app with create_app(), as every worker and CLI command does,
+checked against a budget.
+
+    python -m benchmarks.bench_startup [--runs 7] [--budget-ms 600]
+                                       [--top 15] [--output FILE]
+
+Each run is a fresh interpreter timing ``from app import create_app``
+and ``create_app()``; the medians are reported, and the command exits
+with status 1 when the median total is over ``--budget-ms``. One more
+run under ``python -X importtime`` breaks the import down by package
+(the time spent in each package's own modules), slowest first.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from benchmarks.bench_routes import RESULTS_DIR, _git
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median cold start, warm template bytecode cache; app.py took ~880ms
+# before it became a factory that leaves alembic and WTForms unimported.
+BUDGET_MS = 600
+
+STARTUP = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+created = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1e3,
+                  'create_ms': (created - imported) * 1e3}))
+"""
+
+
+def _python(*args):
+    # as a worker starts: production settings, no debug-level SQL logging
+    env = dict(os.environ, FYYUR_CONFIG='production')
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def time_startup():
+    """Milliseconds importing app.py and running create_app()."""
+    timings = json.loads(_python('-c', STARTUP).stdout.splitlines()[-1])
+    timings['total_ms'] = timings['import_ms'] + timings['create_ms']
+    return timings
+
+
+def import_profile():
+    """Package -> milliseconds spent in its own modules importing app.py."""
+    stderr = _python('-X', 'importtime', '-c', 'import app').stderr
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us) / 1e3
+    return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    parser.add_argument('--top', type=int, default=15,
+                        help='packages listed from the import profile')
+    parser.add_argument('--output', help='results file (default: '
+                        'benchmarks/results/startup-<commit>.json)')
+    args = parser.parse_args()
+
+    # the first run fills the template bytecode cache, as the first worker
+    # after a deploy would; it is not counted
+    time_startup()
+    runs = [time_startup() for _ in range(args.runs)]
+    medians = {name: round(statistics.median(run[name] for run in runs), 1)
+               for name in ('import_ms', 'create_ms', 'total_ms')}
+    profile = import_profile()
+
+    print(f'import app.py  {medians["import_ms"]:7.1f} ms median')
+    print(f'create_app()   {medians["create_ms"]:7.1f} ms median')
+    print(f'cold start     {medians["total_ms"]:7.1f} ms median '
+          f'(budget {args.budget_ms:.0f} ms)\n')
+    print('import time by package (python -X importtime, self time):')
+    for package, ms in list(profile.items())[:args.top]:
+        print(f'  {package:<24} {ms:7.1f} ms')
+
+    commit = _git('rev-parse', '--short', 'HEAD')
+    report = {
+        'commit': commit,
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'runs': args.runs,
+        'budget_ms': args.budget_ms,
+        'median': medians,
+        'import_profile_ms': {package: round(ms, 1)
+                              for package, ms in profile.items()},
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'startup-{commit or "unknown"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'\nresults written to {output}')
+
+    if medians['total_ms'] > args.budget_ms:
+        sys.exit(f'cold start {medians["total_ms"]:.0f} ms is over the '
+                 f'{args.budget_ms:.0f} ms budget')
+
+
+if __name__ == '__main__':
+    main()
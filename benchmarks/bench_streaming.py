@@ -0,0 +1,129 @@
+"""
+Streamed against whole-page rendering of the largest listings: the
+busiest venue's and artist's detail pages and a full page of /shows.
+
+    FYYUR_CONFIG=test python -m benchmarks.dataset --truncate   # once
+    python -m benchmarks.bench_streaming [--repeat 5]
+
+For each page, "whole" renders it with render_template over lists, as
+the views did before, and "streamed" reads the streamed response a chunk
+at a time as a server would; both report the time to the first byte,
+the total time and the peak Python memory (tracemalloc, in a separate
+run). The bytes sent for each Accept-Encoding follow. The page cache is
+disabled.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+# the database benchmarks.dataset fills
+os.environ.setdefault('FYYUR_CONFIG', 'test')
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def pages(app):
+    """(name, path, template, context builder) of each page measured."""
+    from models import db, Show
+    from queries import artist_detail, venue_detail
+
+    with app.app_context():
+        busiest = {
+            name: db.session.query(column).group_by(column).order_by(
+                db.func.count().desc()).limit(1).scalar()
+            for name, column in (('venue', Show.venue_id),
+                                 ('artist', Show.artist_id))}
+        db.session.remove()
+    if not busiest['venue'] or not busiest['artist']:
+        sys.exit('No shows in the database; run benchmarks.dataset first.')
+
+    def shows():
+        from pagination import MAX_PAGE_SIZE
+        from queries import show_listing
+
+        page = show_listing(limit=MAX_PAGE_SIZE)
+        return {'shows': [dict(show._mapping) for show in page],
+                'page': page}
+
+    return [
+        ('venue detail', f'/venues/{busiest["venue"]}',
+         'pages/show_venue.html',
+         lambda: {'venue': venue_detail(busiest['venue'])}),
+        ('artist detail', f'/artists/{busiest["artist"]}',
+         'pages/show_artist.html',
+         lambda: {'artist': artist_detail(busiest['artist'])}),
+        ('shows', '/shows?limit=200', 'pages/shows.html', shows),
+    ]
+
+
+def whole(app, path, template, context):
+    from flask import render_template
+
+    with app.test_request_context(path):
+        start = time.perf_counter()
+        html = render_template(template, **context())
+        done = time.perf_counter() - start
+    # nothing can be sent before the page is complete
+    return done, done, len(html.encode())
+
+
+def streamed(app, path, encoding='identity'):
+    client = app.test_client()
+    start = time.perf_counter()
+    response = client.get(path, headers={'Accept-Encoding': encoding})
+    first, size = None, 0
+    try:
+        for chunk in response.response:
+            if first is None:
+                first = time.perf_counter() - start
+            size += len(chunk)
+    finally:
+        response.close()
+    return first, time.perf_counter() - start, size
+
+
+def peak_memory(measure):
+    tracemalloc.start()
+    try:
+        measure()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app()
+    app.extensions['page_cache'].backend = None
+    for name, path, template, context in pages(app):
+        print(f'{name} ({path})')
+        modes = {
+            'whole': lambda: whole(app, path, template, context),
+            'streamed': lambda: streamed(app, path),
+        }
+        for mode, measure in modes.items():
+            measure()  # warm up
+            runs = [measure() for _ in range(args.repeat)]
+            peak = peak_memory(measure)
+            print(f'  {mode:<9} first byte '
+                  f'{statistics.median(run[0] for run in runs) * 1e3:8.1f} ms'
+                  f'  total {statistics.median(run[1] for run in runs) * 1e3:8.1f} ms'
+                  f'  peak {peak / 2**20:7.1f} MiB  {runs[0][2]:9d} bytes')
+        for encoding in ENCODINGS:
+            first, total, size = streamed(app, path, encoding)
+            print(f'  {encoding:<9} first byte {first * 1e3:8.1f} ms'
+                  f'  total {total * 1e3:8.1f} ms  {size:9d} bytes sent')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Cost of validating venue records: the shared rules of validation.py,
+the importer's row path on top of them, and a WTForms form per record
+(how the importer validated rows before; timed on a sample).
+
+    python -m benchmarks.bench_validation [--records 1000000]
+                                          [--form-sample 20000]
+
+Records are generated venues, a tenth of them broken in one field, and
+are streamed through the validators rather than held in memory.
+"""
+import argparse
+import time
+from itertools import cycle, islice
+
+from benchmarks.dataset import Generator
+from enums import Genre
+
+POOL = 10000
+
+BREAKAGES = [
+    ('state', 'ZZ'),
+    ('phone', '555-01'),
+    ('genres', ['Polka']),
+    ('name', ''),
+    ('website_link', 'not a url'),
+]
+
+
+def record_pool(size=POOL, seed=1):
+    """``size`` venue records as a form would submit them."""
+    generator = Generator(seed)
+    genre_names = {genre.value: genre.name for genre in Genre}
+    pool = []
+    for index in range(size):
+        name, city, state, address, phone, genres, seeking = \
+            generator.venue(index + 1)
+        record = {
+            'name': name, 'city': city, 'state': state, 'address': address,
+            'phone': phone, 'genres': [genre_names[genre] for genre in genres],
+            'image_link': f'https://images.example.com/venues/{index}.jpg',
+            'facebook_link': f'https://www.facebook.com/venue{index}',
+            'website_link': '' if index % 3 else f'http://venue{index}.com',
+            'seeking_talent': seeking, 'seeking_description': '',
+        }
+        if index % 10 == 0:
+            field, value = BREAKAGES[index // 10 % len(BREAKAGES)]
+            record[field] = value
+        pool.append(record)
+    return pool
+
+
+def _rows(records):
+    """Records as CSV import rows: strings, genres as an array literal."""
+    for record in records:
+        row = dict(record)
+        row['genres'] = '{' + ','.join(record['genres']) + '}'
+        row['seeking_talent'] = 'true' if record['seeking_talent'] else ''
+        yield row
+
+
+def time_rules(pool, count):
+    from validation import VENUE_RULES
+
+    start = time.perf_counter()
+    invalid = sum(1 for errors in VENUE_RULES.validate(
+        islice(cycle(pool), count)) if errors)
+    return time.perf_counter() - start, invalid
+
+
+def time_import_rows(pool, count):
+    from importer import BATCH_SIZE, VALIDATORS, _batches
+
+    rows = list(_rows(pool))
+    validate = VALIDATORS['venues'][1]
+    invalid = 0
+    start = time.perf_counter()
+    for batch in _batches(enumerate(islice(cycle(rows), count)), BATCH_SIZE):
+        invalid += len(validate(batch)[1])
+    return time.perf_counter() - start, invalid
+
+
+def time_forms(pool, count):
+    from werkzeug.datastructures import MultiDict
+
+    from app import create_app
+    from forms import VenueForm
+
+    app = create_app()
+
+    formdata = []
+    for record in pool:
+        data = MultiDict()
+        for name, value in record.items():
+            if name == 'genres':
+                for genre in value:
+                    data.add(name, genre)
+            elif name == 'seeking_talent':
+                if value:
+                    data.add(name, 'y')
+            else:
+                data.add(name, value)
+        formdata.append(data)
+
+    invalid = 0
+    with app.test_request_context():
+        start = time.perf_counter()
+        for data in islice(cycle(formdata), count):
+            invalid += not VenueForm(data, meta={'csrf': False}).validate()
+        return time.perf_counter() - start, invalid
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--form-sample', type=int, default=20000,
+                        help='records validated through VenueForm')
+    args = parser.parse_args()
+
+    pool = record_pool()
+    cases = [
+        ('validation rules', time_rules, args.records),
+        ('import rows', time_import_rows, args.records),
+        ('VenueForm per record', time_forms, args.form_sample),
+    ]
+    print(f'{args.records} venue records ({POOL} distinct, 10% invalid)')
+    for name, case, count in cases:
+        seconds, invalid = case(pool, count)
+        per_record = seconds / count
+        print(f'{name:<22} {count:8d} in {seconds:7.2f}s '
+              f'{per_record * 1e6:7.2f} us/record '
+              f'{1 / per_record:10.0f} records/s '
+              f'{invalid / count:6.1%} invalid' +
+              ('' if count == args.records else
+               f'  (~{per_record * args.records:.0f}s for {args.records})'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Fill Venue, Artist and Show with a reproducible synthetic dataset.
+
+    FYYUR_CONFIG=test python -m benchmarks.dataset [--venues 10000]
+        [--artists 50000] [--shows 2000000] [--seed 1] [--truncate]
+
+Rows are streamed to Postgres with COPY in chunks, so millions of shows
+load in a minute or so without holding them in memory. It adds (and
+with ``--truncate`` deletes) rows wholesale, so it only runs with the
+test config and TEST_DATABASE_URL set.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from enums import Genre
+from importer import copy_rows
+
+os.environ.setdefault('FYYUR_CONFIG', 'test')
+
+# Rough share of live music venues per state.
+STATE_WEIGHTS = {
+    'CA': 12, 'NY': 9, 'TX': 8, 'FL': 6, 'IL': 5, 'PA': 4, 'TN': 4,
+    'WA': 3, 'GA': 3, 'MA': 3, 'CO': 3, 'OR': 2, 'LA': 2, 'NC': 2,
+}
+CITIES = {
+    'CA': ['Los Angeles', 'San Francisco', 'San Diego', 'Oakland',
+           'Sacramento'],
+    'NY': ['New York', 'Brooklyn', 'Buffalo', 'Rochester'],
+    'TX': ['Austin', 'Houston', 'Dallas', 'San Antonio'],
+    'FL': ['Miami', 'Orlando', 'Tampa'],
+    'IL': ['Chicago', 'Springfield'],
+    'PA': ['Philadelphia', 'Pittsburgh'],
+    'TN': ['Nashville', 'Memphis'],
+    'WA': ['Seattle', 'Spokane'],
+    'GA': ['Atlanta', 'Savannah'],
+    'MA': ['Boston', 'Cambridge'],
+    'CO': ['Denver', 'Boulder'],
+    'OR': ['Portland', 'Eugene'],
+    'LA': ['New Orleans', 'Baton Rouge'],
+    'NC': ['Charlotte', 'Asheville'],
+}
+# Zipf-like genre popularity, most common first.
+GENRE_WEIGHTS = dict(zip(
+    ['Rock n Roll', 'Pop', 'Hip-Hop', 'Jazz', 'Electronic', 'Alternative',
+     'Country', 'R&B', 'Folk', 'Blues', 'Soul', 'Punk', 'Heavy Metal',
+     'Classical', 'Reggae', 'Funk', 'Instrumental', 'Musical Theatre',
+     'Other'],
+    [1 / rank for rank in range(1, 20)]))
+assert set(GENRE_WEIGHTS) == {genre.value for genre in Genre}
+
+WORDS = ['Blue', 'Red', 'Golden', 'Velvet', 'Electric', 'Midnight', 'Silver',
+         'Lucky', 'Wild', 'Little', 'Grand', 'Old', 'Crystal', 'Neon', 'Iron',
+         'Copper', 'Echo', 'Lunar', 'Rusty', 'Broken']
+VENUE_NOUNS = ['Room', 'Hall', 'Lounge', 'Tavern', 'Club', 'Theatre',
+               'Ballroom', 'Garage', 'Cellar', 'Pavilion']
+ARTIST_NOUNS = ['Foxes', 'Wolves', 'Riders', 'Saints', 'Strangers', 'Kings',
+                'Ghosts', 'Giants', 'Sparrows', 'Machines']
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Casey', 'Robin', 'Jamie',
+               'Morgan', 'Riley', 'Avery', 'Quinn', 'Drew']
+LAST_NAMES = ['Reyes', 'Nguyen', 'Okafor', 'Smith', 'Kowalski', 'Haddad',
+              'Larsen', 'Moreau', 'Tanaka', 'Silva', 'Byrne', 'Novak']
+
+CHUNK = 50000
+
+
+class Generator:
+    """Seeded row generators; the same seed yields the same dataset."""
+
+    def __init__(self, seed=1, now=None):
+        self.random = random.Random(seed)
+        self.now = now or datetime(2026, 1, 1)
+        self._states = list(CITIES)
+        self._state_weights = [STATE_WEIGHTS[state] for state in CITIES]
+        self._genres = list(GENRE_WEIGHTS)
+        self._genre_weights = list(GENRE_WEIGHTS.values())
+
+    def _place(self):
+        state = self.random.choices(self._states, self._state_weights)[0]
+        return self.random.choice(CITIES[state]), state
+
+    def _genre_list(self):
+        count = self.random.choices([1, 2, 3], [6, 3, 1])[0]
+        return sorted(set(self.random.choices(
+            self._genres, self._genre_weights, k=count)))
+
+    def _phone(self):
+        return '{}-{}-{:04d}'.format(self.random.randint(200, 999),
+                                     self.random.randint(200, 999),
+                                     self.random.randint(0, 9999))
+
+    def venue(self, index):
+        city, state = self._place()
+        name = '{} {} {}'.format(self.random.choice(WORDS),
+                                 self.random.choice(VENUE_NOUNS), index)
+        return (name, city, state,
+                '{} {} St'.format(self.random.randint(1, 9999),
+                                  self.random.choice(WORDS)),
+                self._phone(), self._genre_list(),
+                self.random.random() < 0.3)
+
+    def artist(self, index):
+        city, state = self._place()
+        if self.random.random() < 0.4:
+            name = '{} {} {}'.format(self.random.choice(FIRST_NAMES),
+                                     self.random.choice(LAST_NAMES), index)
+        else:
+            name = 'The {} {} {}'.format(self.random.choice(WORDS),
+                                         self.random.choice(ARTIST_NOUNS),
+                                         index)
+        return (name, city, state, self._phone(), self._genre_list(),
+                self.random.random() < 0.4)
+
+    def _popular(self, count):
+        """An id in 1..count; a third of picks favour the low ids."""
+        if self.random.random() < 0.3:
+            return min(int(self.random.paretovariate(1.2)), count)
+        return self.random.randint(1, count)
+
+    def show(self, venues, artists):
+        """A show up to two years either side of ``now``."""
+        start_time = self.now + timedelta(
+            days=self.random.randint(-730, 730),
+            hours=self.random.choice([18, 19, 20, 21, 22]))
+        return self._popular(venues), self._popular(artists), start_time
+
+
+def _chunks(count):
+    for start in range(0, count, CHUNK):
+        yield range(start, min(start + CHUNK, count))
+
+
+def generate(connection, venues=10000, artists=50000, shows=2000000,
+             seed=1, truncate=False, log=print):
+    """
+    Load the dataset through a DBAPI ``connection``. Show ids reference
+    venue and artist ids 1..N, so the tables must be empty (or
+    ``truncate`` set) for them to line up.
+    """
+    generator = Generator(seed)
+    cursor = connection.cursor()
+    if truncate:
+        cursor.execute('TRUNCATE "Show", "Venue", "Artist" '
+                       'RESTART IDENTITY CASCADE')
+
+    start = time.perf_counter()
+    for chunk in _chunks(venues):
+        copy_rows(cursor, 'Venue',
+                  ['name', 'city', 'state', 'address', 'phone', 'genres',
+                   'seeking_talent'],
+                  (generator.venue(index + 1) for index in chunk))
+    log(f'{venues} venues in {time.perf_counter() - start:.1f}s')
+
+    start = time.perf_counter()
+    for chunk in _chunks(artists):
+        copy_rows(cursor, 'Artist',
+                  ['name', 'city', 'state', 'phone', 'genres',
+                   'seeking_venue'],
+                  (generator.artist(index + 1) for index in chunk))
+    log(f'{artists} artists in {time.perf_counter() - start:.1f}s')
+
+    start = time.perf_counter()
+    for chunk in _chunks(shows):
+        copy_rows(cursor, 'Show', ['venue_id', 'artist_id', 'start_time'],
+                  (generator.show(venues, artists) for _ in chunk))
+    log(f'{shows} shows in {time.perf_counter() - start:.1f}s')
+
+    # fresh statistics, or the planner guesses on the first benchmark run
+    cursor.execute('ANALYZE "Venue", "Artist", "Show"')
+    connection.commit()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--venues', type=int, default=10000)
+    parser.add_argument('--artists', type=int, default=50000)
+    parser.add_argument('--shows', type=int, default=2000000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--truncate', action='store_true',
+                        help='empty the tables first')
+    args = parser.parse_args()
+
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    if not app.testing or not os.environ.get('TEST_DATABASE_URL'):
+        sys.exit('benchmarks.dataset rewrites the tables: run it with the '
+                 'test config and TEST_DATABASE_URL set.')
+
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            generate(connection.connection, args.venues, args.artists,
+                     args.shows, args.seed, args.truncate)
+        finally:
+            connection.close()
+
+
+if __name__ == '__main__':
+    main()
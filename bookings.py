@@ -0,0 +1,56 @@
+from sqlalchemy import func, select
+
+from models import db, Show, MAX_SHOW_DURATION
+
+#----------------------------------------------------------------------------#
+# Venue and artist availability.
+#----------------------------------------------------------------------------#
+
+# Show columns holding the venue or artist whose bookings are checked.
+KEYS = {
+    'venue': Show.venue_id,
+    'artist': Show.artist_id,
+}
+# First key of each one's pg_advisory_xact_lock(key, id) booking lock.
+LOCK_KEYS = {
+    'venue': 1,
+    'artist': 2,
+}
+
+
+def overlap_query(kind, entity_id, start, end, session=None):
+    """
+    The shows of a venue or artist (``kind``) overlapping ``[start,
+    end)``, in start time order. No show lasts longer than
+    MAX_SHOW_DURATION, so only those starting after ``start -
+    MAX_SHOW_DURATION`` can overlap: one range of the (<kind>_id,
+    start_time) index, however many shows there are.
+    """
+    return (session or db.session).query(
+        Show.id, Show.venue_id, Show.artist_id, Show.start_time,
+        Show.end_time.label('end_time')
+    ).filter(
+        KEYS[kind] == entity_id,
+        Show.start_time > start - MAX_SHOW_DURATION,
+        Show.start_time < end,
+        Show.end_time > start
+    ).order_by(Show.start_time, Show.id)
+
+
+def conflicts(start, end, venue_id=None, artist_id=None, session=None):
+    """'venue' and/or 'artist' -> their shows overlapping [start, end)."""
+    ids = {'venue': venue_id, 'artist': artist_id}
+    return {kind: overlap_query(kind, entity_id, start, end, session).all()
+            for kind, entity_id in ids.items() if entity_id is not None}
+
+
+def lock(venue_id, artist_id):
+    """
+    Take the venue's and the artist's booking locks until the transaction
+    ends, so a concurrent booking of either checks for conflicts after
+    this one is committed. Venue first, so two bookings never wait on
+    each other.
+    """
+    for kind, entity_id in (('venue', venue_id), ('artist', artist_id)):
+        db.session.execute(select(
+            func.pg_advisory_xact_lock(LOCK_KEYS[kind], entity_id)))
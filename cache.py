@@ -0,0 +1,418 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from functools import wraps
+
+from flask import g, make_response, request, session
+from werkzeug.wsgi import ClosingIterator
+
+#----------------------------------------------------------------------------#
+# Rendered page cache.
+#----------------------------------------------------------------------------#
+
+CachedPage = namedtuple('CachedPage', ['body', 'status', 'mimetype'])
+
+
+class LRUBackend:
+    """
+    In-process cache, evicting the least recently used pages once either
+    ``max_entries`` or ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires, tags, page)
+        self._tags = defaultdict(set)
+        self._bytes = 0
+        self._generation = 0
+        self._invalidated_at = 0.0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        return self._generation
+
+    def invalidated_at(self):
+        return self._invalidated_at
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key, page, tags, ttl, generation):
+        with self._lock:
+            # Something was invalidated while the page was rendering.
+            if generation != self._generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, tags, page)
+            self._bytes += len(page.body)
+            for tag in tags:
+                self._tags[tag].add(key)
+            while self._entries and (len(self._entries) > self.max_entries or
+                                     self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate(self, tags):
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.time()
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.time()
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry[2].body)
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SQLiteBackend:
+    """
+    Cache kept in a local SQLite file, so every worker process on the host
+    shares the same pages and sees the same invalidations. Like
+    LRUBackend, evicts the least recently read pages once either
+    ``max_entries`` or ``max_bytes`` is exceeded.
+    """
+
+    # Stored as the file's user_version; a file with another version has
+    # its pages dropped and its tables made again.
+    SCHEMA_VERSION = 1
+    SCHEMA = [
+        '''CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, body BLOB, status INTEGER, mimetype TEXT,
+            expires REAL, size INTEGER, accessed REAL)''',
+        '''CREATE TABLE IF NOT EXISTS tags (
+            tag TEXT, key TEXT, PRIMARY KEY (tag, key))''',
+        'CREATE INDEX IF NOT EXISTS ix_tags_key ON tags (key)',
+        '''CREATE TABLE IF NOT EXISTS meta (
+            name TEXT PRIMARY KEY, value INTEGER)''',
+        "INSERT OR IGNORE INTO meta VALUES ('generation', 0)",
+        "INSERT OR IGNORE INTO meta VALUES ('invalidated_at', 0)",
+    ]
+
+    def __init__(self, path, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._local = threading.local()
+        with self._connect() as connection:
+            # the workers starting together make the tables once
+            connection.execute('BEGIN IMMEDIATE')
+            version = connection.execute('PRAGMA user_version').fetchone()[0]
+            if version != self.SCHEMA_VERSION:
+                connection.execute('DROP TABLE IF EXISTS entries')
+                connection.execute('DROP TABLE IF EXISTS tags')
+                connection.execute(
+                    f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def generation(self):
+        return self._connect().execute(
+            "SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def invalidated_at(self):
+        return self._connect().execute(
+            "SELECT value FROM meta WHERE name = 'invalidated_at'"
+        ).fetchone()[0]
+
+    def get(self, key):
+        connection = self._connect()
+        row = connection.execute(
+            'SELECT body, status, mimetype, expires FROM entries WHERE key = ?',
+            (key,)).fetchone()
+        now = time.time()
+        if row is None or row[3] < now:
+            return None
+        with connection:
+            connection.execute(
+                'UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return CachedPage(*row[:3])
+
+    def set(self, key, page, tags, ttl, generation):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            if generation != self.generation():
+                return False
+            connection.execute('DELETE FROM tags WHERE key = ?', (key,))
+            connection.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, page.body, page.status, page.mimetype, now + ttl,
+                 len(page.body), now))
+            connection.executemany('INSERT OR IGNORE INTO tags VALUES (?, ?)',
+                                   [(tag, key) for tag in tags])
+            self._evict(connection, now)
+        return True
+
+    def _evict(self, connection, now):
+        connection.execute(
+            'DELETE FROM tags WHERE key IN '
+            '(SELECT key FROM entries WHERE expires < ?)', (now,))
+        connection.execute('DELETE FROM entries WHERE expires < ?', (now,))
+        entries, size = connection.execute(
+            'SELECT COUNT(*), TOTAL(size) FROM entries').fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        # keeps the most recently read pages that fit both limits
+        excess = [(key,) for key, in connection.execute('''
+            SELECT key FROM (
+                SELECT key, ROW_NUMBER() OVER recent AS position,
+                       SUM(size) OVER recent AS size
+                FROM entries WINDOW recent AS (ORDER BY accessed DESC, key))
+            WHERE position > ? OR size > ?''',
+            (self.max_entries, self.max_bytes))]
+        connection.executemany('DELETE FROM tags WHERE key = ?', excess)
+        connection.executemany('DELETE FROM entries WHERE key = ?', excess)
+        self.evictions += len(excess)
+
+    def invalidate(self, tags):
+        tags = list(tags)
+        marks = ', '.join('?' * len(tags))
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+            connection.execute(
+                "UPDATE meta SET value = ? WHERE name = 'invalidated_at'",
+                (time.time(),))
+            if not tags:
+                return
+            keys = f'SELECT key FROM tags WHERE tag IN ({marks})'
+            connection.execute(f'DELETE FROM entries WHERE key IN ({keys})',
+                               tags)
+            connection.execute(f'DELETE FROM tags WHERE key IN ({keys})', tags)
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+            connection.execute(
+                "UPDATE meta SET value = ? WHERE name = 'invalidated_at'",
+                (time.time(),))
+            connection.execute('DELETE FROM entries')
+            connection.execute('DELETE FROM tags')
+
+    def __len__(self):
+        return self._connect().execute(
+            'SELECT COUNT(*) FROM entries').fetchone()[0]
+
+
+class PageCache:
+    """
+    Caches the rendered HTML of GET views.
+
+    Views declare the tags their page depends on: ``@page_cache.cached(
+    'venues', 'venue:{venue_id}')`` formats tags with the view arguments,
+    and ``add_cache_tags`` adds tags found while rendering (for example
+    every artist shown on a venue page). Write handlers call
+    ``invalidate`` with the tags they touched.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.default_ttl = 300
+        self.max_streamed_bytes = 8 * 1024 * 1024
+        self.replica_lag = 10
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_TYPE', 'lru')
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+        self.max_streamed_bytes = app.config.get('CACHE_MAX_STREAMED_BYTES',
+                                                 8 * 1024 * 1024)
+        self.replica_lag = app.config.get('READ_YOUR_WRITES_SECONDS', 10)
+        max_entries = app.config.get('CACHE_MAX_ENTRIES', 1024)
+        if kind == 'lru':
+            self.backend = LRUBackend(
+                max_entries, app.config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        elif kind == 'sqlite':
+            path = app.config.get('CACHE_PATH') or \
+                os.path.join(app.instance_path, 'page_cache.sqlite3')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.backend = SQLiteBackend(
+                path, max_entries,
+                app.config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        elif kind == 'null':
+            self.backend = None
+        else:
+            raise ValueError(f"Unknown CACHE_TYPE: {kind}")
+        app.extensions['page_cache'] = self
+
+    def cached(self, *tags, ttl=None):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                # Pages carrying flashed messages are one-offs.
+                if self.backend is None or request.method != 'GET' or \
+                        session.get('_flashes'):
+                    return view(**kwargs)
+
+                key = page_key(request.endpoint, request.view_args,
+                               request.args.items(multi=True))
+                page = self.get(key)
+                if page is not None:
+                    response = make_response(page.body, page.status)
+                    response.mimetype = page.mimetype
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                generation = self.backend.generation()
+                # A replica can still have the rows from before the last
+                # invalidation, and its page would be cached for the TTL:
+                # render misses from the primary until the replicas caught
+                # up, as the client that wrote reads from it.
+                if time.time() - self.backend.invalidated_at() < \
+                        self.replica_lag:
+                    g.read_primary = True
+                g.cache_tags = page_tags = {tag.format(**kwargs)
+                                            for tag in tags}
+                response = make_response(view(**kwargs))
+                if response.status_code == 200 and \
+                        not session.get('_flashes'):
+                    if response.is_streamed:
+                        # tags keep being added as the page renders
+                        response.response = self._store_when_sent(
+                            response.response, response, key, page_tags,
+                            generation, ttl)
+                    else:
+                        self.put(key, CachedPage(response.get_data(),
+                                                 response.status_code,
+                                                 response.mimetype),
+                                 page_tags, generation, ttl)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def _store_when_sent(self, chunks, response, key, tags, generation, ttl):
+        """
+        Pass the ``chunks`` of a streamed ``response`` through, storing
+        the page once the last is sent; not when the client went away
+        first, or the page outgrew max_streamed_bytes.
+        """
+        def tee():
+            body, size = [], 0
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode(response.charset)
+                if body is not None:
+                    body.append(chunk)
+                    size += len(chunk)
+                    if size > self.max_streamed_bytes:
+                        body = None
+                yield chunk
+            if body is not None:
+                self.put(key, CachedPage(b''.join(body), response.status_code,
+                                         response.mimetype),
+                         tags, generation, ttl)
+
+        # closes ``chunks`` even if never iterated (a HEAD request)
+        return ClosingIterator(tee(), getattr(chunks, 'close', None))
+
+    def get(self, key):
+        """The cached page under ``key``, counting the hit or miss."""
+        page = self.backend.get(key) if self.backend is not None else None
+        if page is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return page
+
+    def put(self, key, page, tags, generation, ttl=None):
+        """
+        Store ``page``, unless something was invalidated since
+        ``generation`` was read, before rendering it.
+        """
+        if self.backend is not None:
+            self.backend.set(key, page, frozenset(tags),
+                             ttl or self.default_ttl, generation)
+
+    def invalidate(self, *tags):
+        if self.backend is None:
+            return
+        self.invalidations += 1
+        self.backend.invalidate(tags)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        """
+        The backend's entry count, and this worker process's hit, miss,
+        eviction and invalidation counters.
+        """
+        # an empty backend is falsy (it has a length)
+        backend = self.backend
+        return {
+            "backend": type(backend).__name__ if backend is not None else None,
+            "pid": os.getpid(),
+            "entries": len(backend) if backend is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": backend.evictions if backend is not None else 0,
+            "invalidations": self.invalidations,
+        }
+
+
+def page_key(endpoint, view_args, args):
+    """Cache key of a page, from its endpoint and (name, value) arguments."""
+    args = '&'.join(f'{name}={value}' for name, value in sorted(args))
+    raw = f'{endpoint}|{sorted((view_args or {}).items())}|{args}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def add_cache_tags(*tags):
+    """Tag the page being rendered with entities it displays."""
+    if 'cache_tags' in g:
+        g.cache_tags.update(tags)
+
+
+page_cache = PageCache()
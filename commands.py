@@ -0,0 +1,219 @@
+import json
+import os
+import time
+from datetime import datetime
+
+import click
+from sqlalchemy import func, select
+
+from cache import page_cache
+from export import ENCODERS, export_shows
+from importer import BATCH_SIZE, VALIDATORS, file_format, import_rows, read_rows
+from models import db, Venue, Artist, Show
+from queries import refresh_venue_summaries
+from templating import report
+import assets
+
+#----------------------------------------------------------------------------#
+# CLI commands.
+#----------------------------------------------------------------------------#
+
+
+def _hot_queries(now):
+    """Statements behind the pages that filter or sort on "Show"."""
+    return {
+        'show_venue': db.session.query(Show, Artist)
+        .join(Artist, Show.artist_id == Artist.id)
+        .filter(Show.venue_id == 1),
+        'show_artist': db.session.query(Show, Venue)
+        .join(Venue, Show.venue_id == Venue.id)
+        .filter(Show.artist_id == 1),
+        'venues': db.session.query(
+            Venue.id,
+            select(func.count(Show.id))
+            .where(Show.venue_id == Venue.id, Show.start_time > now)
+            .correlate(Venue).scalar_subquery())
+        .order_by(Venue.city, Venue.state, Venue.name, Venue.id)
+        .limit(50),
+        'shows': db.session.query(Show.id)
+        .order_by(Show.start_time.desc(), Show.id.desc())
+        .limit(50),
+    }
+
+
+def _seq_scans(plan, table):
+    """Yield every Seq Scan node over ``table`` in an EXPLAIN JSON plan."""
+    if plan.get('Node Type') == 'Seq Scan' and \
+            plan.get('Relation Name') == table:
+        yield plan
+    for child in plan.get('Plans', []):
+        yield from _seq_scans(child, table)
+
+
+def _sample_requests():
+    """A request for every page, against the first venue and artist."""
+    venue_id = db.session.query(func.min(Venue.id)).scalar() or 1
+    artist_id = db.session.query(func.min(Artist.id)).scalar() or 1
+    pages = ['/', '/venues', '/artists', '/shows', f'/venues/{venue_id}',
+             f'/artists/{artist_id}', '/venues/create', '/artists/create',
+             '/shows/create', f'/venues/{venue_id}/edit',
+             f'/artists/{artist_id}/edit', '/no-such-page']
+    return [('GET', path, None) for path in pages] + [
+        ('POST', '/venues/search', {'search_term': 'a'}),
+        ('POST', '/artists/search', {'search_term': 'a'}),
+    ]
+
+
+def register_commands(app):
+
+    @app.cli.command('explain')
+    @click.option('--allow-seqscan', is_flag=True,
+                  help='Let the planner pick sequential scans; by default they '
+                       'are disabled so the check works on small tables.')
+    @click.option('--verbose', is_flag=True, help='Print the full plans.')
+    def explain(allow_seqscan, verbose):
+        """Check the hot queries are served by indexes on "Show"."""
+        failed = []
+        with db.engine.connect() as connection:
+            transaction = connection.begin()
+            if not allow_seqscan:
+                connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            for name, query in _hot_queries(datetime.now()).items():
+                compiled = query.statement.compile(dialect=connection.dialect)
+                plan = connection.exec_driver_sql(
+                    'EXPLAIN (FORMAT JSON) ' + str(compiled),
+                    compiled.params).scalar()[0]['Plan']
+                scans = list(_seq_scans(plan, Show.__tablename__))
+                status = 'SEQ SCAN' if scans else 'ok'
+                click.echo(f'{name:<12} {status}')
+                if verbose:
+                    click.echo(json.dumps(plan, indent=2))
+                if scans:
+                    failed.append(name)
+            transaction.rollback()
+        if failed:
+            raise click.ClickException(
+                'sequential scan on "Show" in: ' + ', '.join(failed))
+
+    @app.cli.command('import')
+    @click.argument('kind', type=click.Choice(sorted(VALIDATORS)))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']),
+                  help='Defaults to the file extension.')
+    @click.option('--batch-size', default=BATCH_SIZE, show_default=True,
+                  help='Rows validated, inserted and committed together.')
+    @click.option('--method', type=click.Choice(['copy', 'insert']),
+                  default='copy', show_default=True,
+                  help='COPY, or batched multi-row INSERTs.')
+    @click.option('--rejects', 'rejects_path',
+                  help='Rejected rows file; defaults to PATH.rejects.jsonl.')
+    def import_command(kind, path, format, batch_size, method, rejects_path):
+        """Bulk load venues, artists or shows from CSV or JSON lines."""
+        format = format or file_format(path)
+        if format is None:
+            raise click.BadParameter(
+                'cannot tell the format from the extension; pass --format',
+                param_hint='PATH')
+        rejects_path = rejects_path or path + '.rejects.jsonl'
+        reported = [time.monotonic()]
+
+        def progress(imported, rejected, seconds):
+            if time.monotonic() - reported[0] >= 5:
+                reported[0] = time.monotonic()
+                click.echo(f'{imported} imported, {rejected} rejected '
+                           f'({imported / seconds:.0f} rows/s)', err=True)
+
+        with open(path, newline='', encoding='utf-8') as file, \
+                open(rejects_path, 'w', encoding='utf-8') as rejects:
+            result = import_rows(kind, read_rows(file, format), rejects,
+                                 batch_size, method, progress)
+        if not result.rejected:
+            os.remove(rejects_path)
+        if kind == 'shows':
+            # recount now rather than on the first /venues request
+            refresh_venue_summaries()
+        page_cache.clear()
+        click.echo(f'{result.imported} {kind} imported in '
+                   f'{result.seconds:.1f}s, {result.rejected} rejected' +
+                   (f' (see {rejects_path})' if result.rejected else ''))
+
+    @app.cli.command('export')
+    @click.option('--format', 'format', type=click.Choice(sorted(ENCODERS)),
+                  default='csv', show_default=True)
+    @click.option('--output', type=click.File('w', encoding='utf-8'),
+                  default='-', help='Defaults to stdout.')
+    @click.option('--from', 'start', type=click.DateTime(),
+                  help='Shows starting at or after this time.')
+    @click.option('--to', 'end', type=click.DateTime(),
+                  help='Shows starting before this time.')
+    @click.option('--venue-id', type=int)
+    @click.option('--artist-id', type=int)
+    def export_command(format, output, start, end, venue_id, artist_id):
+        """Stream the show schedule out as CSV or JSON lines."""
+        for chunk in export_shows(db.engine, format, start=start, end=end,
+                                  venue_id=venue_id, artist_id=artist_id):
+            output.write(chunk)
+
+    @app.cli.command('refresh-venues')
+    @click.option('--all', 'everything', is_flag=True,
+                  help='Recount every venue, not just the stale ones.')
+    def refresh_venues(everything):
+        """
+        Recount upcoming shows in the /venues summary; schedule it every
+        minute or so to catch shows that have started.
+        """
+        refreshed = refresh_venue_summaries(everything=everything)
+        page_cache.invalidate('venues')
+        click.echo(f'{refreshed} venues refreshed')
+
+    @app.cli.command('replicas')
+    def replicas_command():
+        """Health check the read replicas."""
+        replicas = app.extensions.get('replicas')
+        if replicas is None:
+            raise click.ClickException(
+                'no replicas configured (DATABASE_REPLICA_URLS)')
+        unhealthy = []
+        for bind in replicas.binds:
+            status = replicas.check(bind, db.get_engine(app, bind=bind))
+            if status['healthy']:
+                click.echo(f'{bind:<12} ok, {status["lag"]:.1f}s behind')
+            else:
+                unhealthy.append(bind)
+                click.echo(f'{bind:<12} DOWN ' + (
+                    status['error'] or f'{status["lag"]:.1f}s behind'))
+        if unhealthy:
+            raise click.ClickException('unhealthy: ' + ', '.join(unhealthy))
+
+    @app.cli.command('templates')
+    @click.option('--repeat', default=5, show_default=True,
+                  help='Times to request every page.')
+    def templates_command(repeat):
+        """Time compiling and rendering each template, slowest first."""
+        # render every time: cached pages and CSRF would skip or fail them
+        backend, page_cache.backend = page_cache.backend, None
+        csrf = app.config.get('WTF_CSRF_ENABLED', True)
+        app.config['WTF_CSRF_ENABLED'] = False
+        try:
+            rows = report(app, _sample_requests(), repeat)
+        finally:
+            page_cache.backend = backend
+            app.config['WTF_CSRF_ENABLED'] = csrf
+        click.echo(f'{"template":<28} {"compile ms":>10} {"renders":>8} '
+                   f'{"render ms":>10}')
+        for name, compiled, renders, rendered in rows:
+            click.echo(f'{name:<28} {compiled * 1e3:10.2f} {renders:8d} ' + (
+                f'{rendered * 1e3:10.2f}' if rendered is not None
+                else f'{"-":>10}'))
+
+    @app.cli.command('assets')
+    def assets_command():
+        """Bundle, fingerprint and precompress the static assets."""
+        manifest = assets.build(app.static_folder)
+        for name, entry in manifest.items():
+            compressed = ' '.join(f'{encoding} {size}' for encoding, size
+                                  in entry['compressed'].items())
+            click.echo(f'{name:<34} {entry["file"]:<50} {entry["size"]:8d}'
+                       f'  {compressed}')
+        click.echo(f'{len(manifest)} assets written to '
+                   f'{os.path.join(app.static_folder, assets.DIST)}')
@@ -0,0 +1,137 @@
+import zlib
+
+from werkzeug.http import parse_accept_header
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:  # optional; without it responses are only gzipped
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# Response compression.
+#----------------------------------------------------------------------------#
+
+# Content types worth compressing; images and the like already are.
+COMPRESSIBLE = ('text/', 'application/json', 'application/javascript',
+                'application/x-ndjson', 'application/manifest+json',
+                'image/svg+xml')
+# Statuses without a body to compress, or with a partial one.
+NO_BODY = {'204', '206', '304'}
+
+
+class _Gzip:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        # flushed, so the client can render each chunk as it arrives
+        return self._compressor.compress(data) + \
+            self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class Compress:
+    """
+    WSGI middleware compressing responses with brotli or gzip, whichever
+    the client's Accept-Encoding prefers (brotli where both are equal),
+    as they are sent: each chunk of a streamed response is compressed
+    and flushed on its own, so nothing is buffered whole.
+
+    Left alone: HEAD requests, responses that already have a
+    Content-Encoding (the precompressed static assets), Cache-Control:
+    no-transform, types not in COMPRESSIBLE and bodies of a known length
+    under ``min_size`` bytes. The app has to call start_response before
+    returning its body, as Flask does.
+    """
+
+    def __init__(self, app, min_size=500, level=6, brotli_quality=4):
+        self.app = app
+        self.min_size = min_size
+        self.encoders = {'gzip': lambda: _Gzip(level)}
+        if brotli is not None:
+            self.encoders = {'br': lambda: _Brotli(brotli_quality),
+                             **self.encoders}
+
+    def negotiate(self, accept_encoding):
+        """The encoding to use given an Accept-Encoding header, or None."""
+        accepted = parse_accept_header(accept_encoding)
+        best = max((accepted[name] for name in self.encoders), default=0)
+        return next((name for name in self.encoders
+                     if best and accepted[name] == best), None)
+
+    def _compressible(self, status, headers):
+        if status.split(' ', 1)[0] in NO_BODY:
+            return False
+        found = {name.lower(): value for name, value in headers}
+        if 'content-encoding' in found or \
+                'no-transform' in found.get('cache-control', ''):
+            return False
+        length = found.get('content-length')
+        if length is not None and int(length) < self.min_size:
+            return False
+        return found.get('content-type', '').startswith(COMPRESSIBLE)
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return self.app(environ, start_response)
+        encoding = self.negotiate(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        encoders = []
+
+        def start(status, headers, exc_info=None):
+            if not self._compressible(status, headers):
+                return start_response(status, headers, exc_info)
+            vary = [value for name, value in headers if name.lower() == 'vary']
+            headers = [(name, value) for name, value in headers
+                       if name.lower() != 'vary']
+            headers.append(('Vary', ', '.join(vary + ['Accept-Encoding'])))
+            if encoding is not None:
+                encoders.append(self.encoders[encoding]())
+                headers = [(name, _weak(value) if name.lower() == 'etag'
+                            else value) for name, value in headers
+                           if name.lower() != 'content-length']
+                headers.append(('Content-Encoding', encoding))
+            return start_response(status, headers, exc_info)
+
+        body = self.app(environ, start)
+        if not encoders:
+            return body
+        return ClosingIterator(_compressed(body, encoders[0]),
+                               getattr(body, 'close', None))
+
+
+def _weak(etag):
+    # the compressed bytes differ from those the tag was made for
+    return etag if etag.startswith('W/') else 'W/' + etag
+
+
+def _compressed(body, encoder):
+    for chunk in body:
+        if chunk:
+            yield encoder.compress(chunk)
+    yield encoder.finish()
+
+
+def init_app(app):
+    """
+    With COMPRESS_RESPONSES, compress the app's responses on the fly
+    (see Compress).
+    """
+    if app.config.get('COMPRESS_RESPONSES', True):
+        app.wsgi_app = Compress(
+            app.wsgi_app, app.config.get('COMPRESS_MIN_SIZE', 500),
+            app.config.get('COMPRESS_LEVEL', 6),
+            app.config.get('COMPRESS_BROTLI_QUALITY', 4))
@@ -1,20 +1,220 @@
 import os
 
 from dotenv import find_dotenv, load_dotenv
+from sqlalchemy.engine import make_url
 
 load_dotenv(find_dotenv())
 
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
 
-SECRET_KEY = os.environ.get("SECRET_KEY")
-FLASK_ENV = os.environ.get("FLASK_ENV")
-FLASK_APP = os.environ.get("FLASK_APP")
+def env_int(name, default):
+    return int(os.environ.get(name, default))
 
-# Connect to the database
-SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
-SQLALCHEMY_TRACK_MODIFICATIONS = False
-SQLALCHEMY_ECHO = True
+
+def env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def env_list(name):
+    return [item.strip() for item in os.environ.get(name, "").split(",")
+            if item.strip()]
+
+
+def replica_binds(urls, connect_timeout=None):
+    """
+    SQLALCHEMY_BINDS entries for read replica URLs (see routing.py).
+    ``connect_timeout`` (seconds) is added to the URLs that don't set
+    one, so a health check of an unreachable replica fails fast.
+    """
+    binds = {}
+    for number, url in enumerate(urls):
+        if connect_timeout:
+            url = make_url(url)
+            if "connect_timeout" not in url.query:
+                url = url.update_query_dict(
+                    {"connect_timeout": str(connect_timeout)})
+            url = url.render_as_string(hide_password=False)
+        binds["replica_{}".format(number)] = url
+    return binds
+
+
+class Config:
+    DEBUG = False
+    TESTING = False
+
+    SECRET_KEY = os.environ.get("SECRET_KEY")
+    FLASK_ENV = os.environ.get("FLASK_ENV")
+    FLASK_APP = os.environ.get("FLASK_APP")
+
+    # Connect to the database
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ECHO = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": env_int("DB_POOL_SIZE", 5),
+        "max_overflow": env_int("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+    }
+
+    # Read replicas, as comma-separated URLs: GET requests read from them
+    # in turn, skipping any that is down or lags more than
+    # REPLICA_MAX_LAG_SECONDS at its last check (one every
+    # REPLICA_CHECK_INTERVAL seconds, in the request that finds it due,
+    # so connecting to one gives up after REPLICA_CONNECT_TIMEOUT). Writes,
+    # and a client's reads for READ_YOUR_WRITES_SECONDS after it wrote, go
+    # to the primary above; so do page cache misses for as long after any
+    # invalidation, lest a lagging replica's page be cached.
+    REPLICA_CONNECT_TIMEOUT = env_int("REPLICA_CONNECT_TIMEOUT", 2)
+    SQLALCHEMY_BINDS = replica_binds(env_list("DATABASE_REPLICA_URLS"),
+                                     REPLICA_CONNECT_TIMEOUT)
+    REPLICA_CHECK_INTERVAL = env_int("REPLICA_CHECK_INTERVAL", 10)
+    REPLICA_MAX_LAG_SECONDS = env_float("REPLICA_MAX_LAG_SECONDS", 5)
+    READ_YOUR_WRITES_SECONDS = env_int("READ_YOUR_WRITES_SECONDS", 10)
+
+    # asgi.py: the asyncpg engine behind the async read routes, and the
+    # threads running every other (Flask) route. Async requests don't
+    # hold a thread while they wait, so the pool is what bounds them.
+    ASYNC_SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": env_int("ASYNC_DB_POOL_SIZE", 20),
+        "max_overflow": env_int("ASYNC_DB_MAX_OVERFLOW", 10),
+        "pool_timeout": env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+    }
+    ASGI_WSGI_THREADS = env_int("ASGI_WSGI_THREADS", 10)
+
+    # Fraction of SQL statements logged to the "fyyur.sql" logger; cheaper
+    # than SQLALCHEMY_ECHO, which formats and logs every statement.
+    SQL_ECHO_SAMPLE_RATE = env_float("SQL_ECHO_SAMPLE_RATE", 0)
+    # Seconds between connection pool checkout/wait stat log lines
+    # (0 disables them).
+    DB_POOL_STATS_INTERVAL = env_int("DB_POOL_STATS_INTERVAL", 60)
+    # Requests running more statements, spending longer in the database or
+    # repeating one statement shape more often than these get logged.
+    SQL_MAX_QUERIES = env_int("SQL_MAX_QUERIES", 50)
+    SQL_SLOW_MS = env_int("SQL_SLOW_MS", 500)
+    N_PLUS_ONE_THRESHOLD = env_int("N_PLUS_ONE_THRESHOLD", 10)
+
+    # File the app's log is written to, if any.
+    LOG_FILE = os.environ.get("LOG_FILE")
+
+    # statement_timeout of the web workers' connections (0: none).
+    DB_STATEMENT_TIMEOUT_MS = 0
+
+    # Fail requests that lazy-load a relationship the view didn't declare.
+    STRICT_LOADING = False
+
+    # Rendered page cache: "lru" (per process, so only right with a single
+    # worker: an invalidation clears the worker handling the write), "sqlite"
+    # (shared by the workers on a host) or "null" to disable it.
+    CACHE_TYPE = os.environ.get("CACHE_TYPE", "lru")
+    CACHE_DEFAULT_TTL = env_int("CACHE_DEFAULT_TTL", 300)
+    CACHE_MAX_ENTRIES = env_int("CACHE_MAX_ENTRIES", 1024)
+    CACHE_MAX_BYTES = env_int("CACHE_MAX_BYTES", 64 * 1024 * 1024)
+    CACHE_PATH = os.environ.get("CACHE_PATH")
+    # Streamed pages larger than this are sent but not cached.
+    CACHE_MAX_STREAMED_BYTES = env_int("CACHE_MAX_STREAMED_BYTES",
+                                       8 * 1024 * 1024)
+    # /cache/stats answers requests with "Authorization: Bearer <token>"
+    # and is not found without one or when this is unset.
+    CACHE_STATS_TOKEN = os.environ.get("CACHE_STATS_TOKEN")
+
+    # Seconds the unfiltered /venues and /artists facet counts, which
+    # count every row, are kept (per process); 0 counts them every time.
+    FACET_COUNTS_TTL = env_int("FACET_COUNTS_TTL", 60)
+
+    # Seconds the show form's recent venue and artist choices are kept
+    # (per process) when no venue or artist write drops them first.
+    LOOKUP_TTL = env_int("LOOKUP_TTL", 300)
+
+    # Compiled templates are kept on disk (instance/jinja unless
+    # TEMPLATE_CACHE_DIR is set) and, with TEMPLATE_WARMUP, all loaded when
+    # the app starts instead of on their first request.
+    TEMPLATE_BYTECODE_CACHE = bool(env_int("TEMPLATE_BYTECODE_CACHE", 1))
+    TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR")
+    TEMPLATE_WARMUP = bool(env_int("TEMPLATE_WARMUP", 1))
+
+    # Serve the bundles and fingerprinted files `flask assets` writes to
+    # static/dist, precompressed and cached by browsers for ASSETS_MAX_AGE
+    # seconds; otherwise the layouts load the source files.
+    ASSETS_BUNDLED = True
+    ASSETS_MAX_AGE = 365 * 24 * 3600
+
+    # Compress responses as they are sent, brotli or gzip as the client
+    # accepts, unless a proxy in front already does (COMPRESS_RESPONSES=0).
+    COMPRESS_RESPONSES = bool(env_int("COMPRESS_RESPONSES", 1))
+    COMPRESS_MIN_SIZE = env_int("COMPRESS_MIN_SIZE", 500)
+    COMPRESS_LEVEL = env_int("COMPRESS_LEVEL", 6)
+    COMPRESS_BROTLI_QUALITY = env_int("COMPRESS_BROTLI_QUALITY", 4)
+
+
+class DevelopmentConfig(Config):
+    # Enable debug mode.
+    DEBUG = True
+    STRICT_LOADING = True
+    SQL_ECHO_SAMPLE_RATE = env_float("SQL_ECHO_SAMPLE_RATE", 1)
+    ASSETS_BUNDLED = False
+
+
+class TestConfig(Config):
+    TESTING = True
+    SECRET_KEY = "test"
+    WTF_CSRF_ENABLED = False
+    STRICT_LOADING = True
+    CACHE_TYPE = "null"
+    FACET_COUNTS_TTL = 0
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        "TEST_DATABASE_URL", Config.SQLALCHEMY_DATABASE_URI)
+    # a second local database standing in for a replica, e.g. a copy made
+    # with CREATE DATABASE fyyur_replica TEMPLATE fyyur
+    SQLALCHEMY_BINDS = replica_binds(env_list("TEST_DATABASE_REPLICA_URLS"),
+                                     Config.REPLICA_CONNECT_TIMEOUT)
+    REPLICA_CHECK_INTERVAL = 1
+
+
+class ProductionConfig(Config):
+    LOG_FILE = os.environ.get("LOG_FILE", "error.log")
+    # production runs several workers
+    CACHE_TYPE = os.environ.get("CACHE_TYPE", "sqlite")
+    SQLALCHEMY_ENGINE_OPTIONS = dict(
+        Config.SQLALCHEMY_ENGINE_OPTIONS,
+        pool_size=env_int("DB_POOL_SIZE", 10),
+        max_overflow=env_int("DB_MAX_OVERFLOW", 5),
+        pool_timeout=env_int("DB_POOL_TIMEOUT", 5),
+    )
+    # Abort statements that run away instead of holding a pooled
+    # connection. Only web workers get it (see app.statement_timeout):
+    # migrations, imports and the other CLI commands run long on purpose.
+    DB_STATEMENT_TIMEOUT_MS = env_int("DB_STATEMENT_TIMEOUT_MS", 5000)
+    ASYNC_SQLALCHEMY_ENGINE_OPTIONS = dict(
+        Config.ASYNC_SQLALCHEMY_ENGINE_OPTIONS,
+        pool_timeout=env_int("DB_POOL_TIMEOUT", 5),
+        connect_args={"server_settings": {"statement_timeout": str(
+            env_int("DB_STATEMENT_TIMEOUT_MS", 5000))}},
+    )
+
+
+configs = {
+    "development": DevelopmentConfig,
+    "test": TestConfig,
+    "production": ProductionConfig,
+}
+
+
+def get_config(name=None):
+    """
+    Config class named by ``name``, FYYUR_CONFIG or FLASK_ENV, in that
+    order; production when none is set, so a deployment missing them
+    doesn't run with the debugger on.
+    """
+    name = name or os.environ.get("FYYUR_CONFIG") or \
+        os.environ.get("FLASK_ENV") or "production"
+    try:
+        return configs[name]
+    except KeyError:
+        raise ValueError("unknown config {!r}, expected one of: {}".format(
+            name, ", ".join(configs))) from None
@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+
+from queries import show_export
+
+#----------------------------------------------------------------------------#
+# Streaming show exports.
+#----------------------------------------------------------------------------#
+
+# Rows fetched from the server-side cursor, and written out, at a time.
+CHUNK_ROWS = 2000
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _csv_chunks(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _jsonl_chunks(columns, partitions):
+    for rows in partitions:
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), default=_isoformat) + '\n'
+            for row in rows)
+
+
+ENCODERS = {
+    'csv': _csv_chunks,
+    'jsonl': _jsonl_chunks,
+}
+
+
+def export_shows(engine, format, **filters):
+    """
+    Generate the shows export as text chunks of ``CHUNK_ROWS`` rows.
+
+    Rows come from a server-side cursor on a connection of its own, so
+    memory stays flat however many shows match, and the connection goes
+    back to the pool when the generator finishes or is closed early (a
+    client disconnecting mid download).
+    """
+    encode = ENCODERS[format]
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, max_row_buffer=CHUNK_ROWS
+        ).execute(show_export(**filters))
+        yield from encode(list(result.keys()),
+                          result.partitions(CHUNK_ROWS))
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import func, literal, select, union_all
+
+from enums import Genre, State
+
+#----------------------------------------------------------------------------#
+# Faceted browsing.
+#----------------------------------------------------------------------------#
+
+# Forms store genre names ("HipHop") and older rows the display values
+# ("Hip-Hop"); both spellings, in any case, resolve to the enum member.
+GENRES = {}
+for _genre in Genre:
+    GENRES[_genre.name.lower()] = GENRES[_genre.value.lower()] = _genre
+STATES = {state.name for state in State}
+
+# Cities listed in the city facet once a state is picked.
+MAX_CITIES = 30
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+class Filters(namedtuple('Filters', ['genres', 'state', 'city'])):
+    """Browse filters: every genre in ``genres``, in ``state``/``city``."""
+
+    def __bool__(self):
+        return bool(self.genres or self.state or self.city)
+
+
+def parse_filters(args):
+    """Filters from ``?genre=&genre=&state=&city=``; InvalidFilter if unknown."""
+    genres = []
+    for value in args.getlist('genre'):
+        genre = GENRES.get(value.strip().lower())
+        if genre is None:
+            raise InvalidFilter(f"unknown genre: {value}")
+        if genre not in genres:
+            genres.append(genre)
+    state = (args.get('state') or '').strip().upper() or None
+    if state is not None and state not in STATES:
+        raise InvalidFilter(f"unknown state: {state}")
+    city = (args.get('city') or '').strip() or None
+    return Filters(tuple(genres), state, city)
+
+
+def genre_clause(model, genre):
+    # && / @> on the array column are both served by its GIN index
+    if genre.name == genre.value:
+        return model.genres.contains([genre.value])
+    return model.genres.overlap([genre.name, genre.value])
+
+
+def clauses(model, filters, skip=()):
+    """WHERE clauses for ``filters``, leaving out the facets in ``skip``."""
+    where = []
+    if filters is None:
+        return where
+    if 'genre' not in skip:
+        where += [genre_clause(model, genre) for genre in filters.genres]
+    if 'state' not in skip and filters.state:
+        where.append(model.state == filters.state)
+    if 'city' not in skip and filters.city:
+        where.append(model.city == filters.city)
+    return where
+
+
+def facet_counts(session, model, filters):
+    """
+    Counts per genre, state and (once a state is picked) city, in one
+    UNION ALL query, each the number of results picking that value would
+    give: genres combine, so they are counted under every filter; a
+    state or city replaces the current one, so those are counted without
+    it.
+    """
+    genres = select(func.unnest(model.genres).label('value')).where(
+        *clauses(model, filters)).subquery()
+    parts = [
+        select(literal('genre').label('facet'), genres.c.value,
+               func.count().label('count')).group_by(genres.c.value),
+        select(literal('state'), model.state, func.count()).where(
+            *clauses(model, filters, skip=('state', 'city'))
+        ).group_by(model.state),
+    ]
+    if filters.state:
+        parts.append(
+            select(literal('city'), model.city, func.count()).where(
+                *clauses(model, filters, skip=('city',))
+            ).group_by(model.city))
+
+    counts = {'genre': {}, 'state': {}, 'city': {}}
+    for facet, value, count in session.execute(union_all(*parts)):
+        if facet == 'genre':
+            value = GENRES.get(value.lower())
+            if value is None:
+                continue
+        counts[facet][value] = counts[facet].get(value, 0) + count
+
+    return {
+        'genre': sorted(counts['genre'].items(), key=lambda item: -item[1]),
+        'state': sorted(((state, count) for state, count in
+                         counts['state'].items() if state in STATES),
+                        key=lambda item: -item[1]),
+        'city': sorted(counts['city'].items(),
+                       key=lambda item: -item[1])[:MAX_CITIES],
+    }
+
+
+class UnfilteredCounts:
+    """
+    facet_counts of the unfiltered listings, which count every row, kept
+    per model for ``ttl`` seconds; filtered counts, narrowed by the
+    genre and (state, city) indexes, are always counted live.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('FACET_COUNTS_TTL', self.ttl)
+        self.invalidate()
+
+    def get(self, session, model, filters):
+        if filters or not self.ttl:
+            return facet_counts(session, model, filters)
+        with self._lock:
+            loaded_at, counts = self._counts.get(model, (None, None))
+            if loaded_at is None or time.monotonic() - loaded_at >= self.ttl:
+                counts = facet_counts(session, model, filters)
+                self._counts[model] = (time.monotonic(), counts)
+            return counts
+
+    def invalidate(self):
+        with self._lock:
+            self._counts.clear()
+
+
+unfiltered_counts = UnfilteredCounts()
+
+
+def facet_links(counts, filters, url):
+    """
+    Facet values for a template: label, count, whether it is selected
+    and the ``url(**args)`` that toggles it.
+    """
+    selected_genres = [genre.name for genre in filters.genres]
+
+    def toggle_genre(genre):
+        if genre.name in selected_genres:
+            return [name for name in selected_genres if name != genre.name]
+        return selected_genres + [genre.name]
+
+    return {
+        'genre': [{
+            'label': genre.value, 'count': count,
+            'selected': genre in filters.genres,
+            'url': url(genre=toggle_genre(genre) or None),
+        } for genre, count in counts['genre']],
+        'state': [{
+            'label': state, 'count': count,
+            'selected': state == filters.state,
+            'url': url(state=None if state == filters.state else state,
+                       city=None),
+        } for state, count in counts['state']],
+        'city': [{
+            'label': city, 'count': count,
+            'selected': city == filters.city,
+            'url': url(city=None if city == filters.city else city),
+        } for city, count in counts['city']],
+    }
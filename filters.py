@@ -1,15 +1,61 @@
-import babel
-import dateutil.parser
+from datetime import datetime, timezone
+from functools import lru_cache
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
+# babel and dateutil are imported by the first page formatting a date,
+# not by every process that imports the app (see bench_startup).
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale='en')
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def _formatter(format, locale):
+    """Formatting callable for a format/locale, built once per pair."""
+    import babel
+    import babel.dates
+
+    locale = babel.Locale.parse(locale)
+    format = FORMATS.get(format, format)
+    if format in ('full', 'long', 'medium', 'short'):
+        # the locale's own named formats, e.g. 'short'
+        return lambda value: babel.dates.format_datetime(
+            value, format, locale=locale)
+    pattern = babel.dates.parse_pattern(format)
+    return lambda value: pattern.apply(value, locale)
+
+
+def _as_datetime(value):
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    # babel treats naive datetimes as UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def format_datetime(value, format='medium', locale='en'):
+    """Format a datetime, or a string dateutil can parse."""
+    return _formatter(format, locale)(_as_datetime(value))
+
+
+def format_datetimes(values, format='medium', locale='en'):
+    """
+    Format many datetimes with a single pattern lookup; repeated
+    timestamps are only formatted once.
+    """
+    formatter = _formatter(format, locale)
+    formatted = {}
+    result = []
+    for value in values:
+        text = formatted.get(value)
+        if text is None:
+            text = formatted[value] = formatter(_as_datetime(value))
+        result.append(text)
+    return result
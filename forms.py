@@ -3,33 +3,97 @@ from datetime import datetime
 from flask_wtf import FlaskForm
 from wtforms import (BooleanField, DateTimeField, SelectField,
                      SelectMultipleField, StringField)
-from wtforms.validators import URL, DataRequired, Optional
+from wtforms.validators import DataRequired, Optional
 
 from enums import Genre, State
-from utils import is_valid_phone
+from lookups import show_references_exist
+from models import DEFAULT_SHOW_DURATION, MAX_SHOW_DURATION
+import bookings
+from validation import ARTIST_RULES, VENUE_RULES
 
 
 class ShowForm(FlaskForm):
     def __init__(self, formdata=None, **kwargs):
         super().__init__(formdata, **kwargs)
         if 'venues' in kwargs:
-            self.venue_id.choices = [(venue.id, venue.name)
-                                     for venue in kwargs['venues']]
+            self.venue_id.choices = list(kwargs['venues'])
         if 'artists' in kwargs:
-            self.artist_id.choices = [(artist.id, artist.name)
-                                      for artist in kwargs['artists']]
+            self.artist_id.choices = list(kwargs['artists'])
 
-    artist_id = SelectField('artist_id', validators=[DataRequired()])
-    venue_id = SelectField('venue_id', validators=[DataRequired()])
+    # choices can lag behind the database, so submitted ids are checked
+    # against it in validate() instead
+    artist_id = SelectField('artist_id', validators=[DataRequired()],
+                            coerce=int, validate_choice=False)
+    venue_id = SelectField('venue_id', validators=[DataRequired()],
+                           coerce=int, validate_choice=False)
 
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
         default=datetime.today()
     )
+    # blank for a show of DEFAULT_SHOW_DURATION
+    end_time = DateTimeField('end_time', validators=[Optional()])
+
+    def validate(self):
+        """custom validate method in your Form:"""
+        rv = FlaskForm.validate(self)
+        if not rv:
+            return False
+        venue_exists, artist_exists = show_references_exist(
+            self.venue_id.data, self.artist_id.data)
+        if not venue_exists:
+            self.venue_id.errors.append('Unknown venue.')
+        if not artist_exists:
+            self.artist_id.errors.append('Unknown artist.')
+        return venue_exists and artist_exists and self.validate_booking()
+
+    def validate_booking(self):
+        """
+        Whether the venue and the artist are both free for the show. Takes
+        their booking locks, which the view's commit of the show releases.
+        """
+        start = self.start_time.data
+        end = self.end_time.data or start + DEFAULT_SHOW_DURATION
+        if not start < end <= start + MAX_SHOW_DURATION:
+            self.end_time.errors.append(
+                'A show ends after it starts, at most '
+                f'{MAX_SHOW_DURATION.total_seconds() // 3600:.0f} hours later.')
+            return False
+        bookings.lock(self.venue_id.data, self.artist_id.data)
+        found = bookings.conflicts(start, end, self.venue_id.data,
+                                   self.artist_id.data)
+        for kind, shows in found.items():
+            self.start_time.errors.extend(
+                f'The {kind} is booked from {show.start_time:%Y-%m-%d %H:%M}'
+                f' to {show.end_time:%Y-%m-%d %H:%M}.' for show in shows)
+        return not any(found.values())
 
 
-class VenueForm(FlaskForm):
+class RecordForm(FlaskForm):
+    """
+    A venue or artist form, checked by the shared validation.py ``rules``
+    (also used by the importer) instead of its field validators, which
+    only mark fields required in the rendered HTML.
+    """
+    rules = None
+
+    def validate(self):
+        self._errors = None
+        for field in self:
+            field.errors = list(field.process_errors)
+        valid = not any(field.errors for field in self)
+        if 'csrf_token' in self:
+            valid = self.csrf_token.validate(self) and valid
+        for name, messages in self.rules.errors(self.data).items():
+            self[name].errors.extend(messages)
+            valid = False
+        return valid
+
+
+class VenueForm(RecordForm):
+    rules = VENUE_RULES
+
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -50,33 +114,16 @@ class VenueForm(FlaskForm):
         'genres', validators=[DataRequired()],
         choices=Genre.choices()
     )
-    image_link = StringField('image_link', validators=[Optional(), URL()])
-    facebook_link = StringField(
-        'facebook_link', validators=[Optional(), URL()])
-    website_link = StringField('website_link', validators=[Optional(), URL()])
+    image_link = StringField('image_link')
+    facebook_link = StringField('facebook_link')
+    website_link = StringField('website_link')
     seeking_talent = BooleanField('seeking_talent')
     seeking_description = StringField('seeking_description')
 
-    def validate(self):
-        """custom validate method in your Form:"""
-        rv = FlaskForm.validate(self)
-        if not rv:
-            return False
-        if self.phone.data and not is_valid_phone(self.phone.data):
-            self.phone.errors.append('Invalid phone.')
-            return False
-        if not set(self.genres.data).issubset(dict(Genre.choices()).keys()):
-            self.genres.errors.append('Invalid genres.')
-            return False
-        if self.state.data not in dict(State.choices()).keys():
-            self.state.errors.append('Invalid state.')
-            return False
-        # if pass validation
-        return True
-
 
+class ArtistForm(RecordForm):
+    rules = ARTIST_RULES
 
-class ArtistForm(FlaskForm):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -90,30 +137,12 @@ class ArtistForm(FlaskForm):
     phone = StringField(
         'phone'
     )
-    image_link = StringField('image_link', validators=[Optional(), URL()])
+    image_link = StringField('image_link')
     genres = SelectMultipleField(
         'genres', validators=[DataRequired()],
         choices=Genre.choices()
     )
-    facebook_link = StringField(
-        'facebook_link', validators=[Optional(), URL()])
-    website_link = StringField('website_link', validators=[Optional(), URL()])
+    facebook_link = StringField('facebook_link')
+    website_link = StringField('website_link')
     seeking_venue = BooleanField('seeking_venue')
     seeking_description = StringField('seeking_description')
-
-    def validate(self):
-        """custom validate method in your Form:"""
-        rv = FlaskForm.validate(self)
-        if not rv:
-            return False
-        if self.phone.data and not is_valid_phone(self.phone.data):
-            self.phone.errors.append('Invalid phone.')
-            return False
-        if not set(self.genres.data).issubset(dict(Genre.choices()).keys()):
-            self.genres.errors.append('Invalid genres.')
-            return False
-        if self.state.data not in dict(State.choices()).keys():
-            self.state.errors.append('Invalid state.')
-            return False
-        # if pass validation
-        return True
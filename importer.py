@@ -0,0 +1,265 @@
+import csv
+import io
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy.exc import DBAPIError
+
+from enums import Genre
+from models import db, Venue, Artist, Show
+from validation import ARTIST_RULES, VENUE_RULES
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+BATCH_SIZE = 5000
+
+# Genre display values ("Hip-Hop") are accepted for the names the forms use.
+GENRE_NAMES = {genre.value: genre.name for genre in Genre}
+FALSE_VALUES = {'', '0', 'false', 'f', 'no', 'n'}
+
+Reject = namedtuple('Reject', ['line', 'row', 'errors'])
+ImportResult = namedtuple('ImportResult', ['imported', 'rejected', 'seconds'])
+
+
+def read_rows(file, format):
+    """Yield ``(line, row dict)`` from a CSV or JSON lines file object."""
+    if format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for line, text in enumerate(file, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as error:
+                message = str(error)
+            else:
+                if isinstance(row, dict):
+                    yield line, row
+                    continue
+                # null, a list, a number or a string
+                message = 'Expected a JSON object'
+            yield line, {'_raw': text.rstrip('\n'), '_error': message}
+    else:
+        raise ValueError(f"Unknown import format: {format}")
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+#----------------------------------------------------------------------------#
+# Validation.
+#----------------------------------------------------------------------------#
+
+
+def _record(row, rules):
+    """
+    Row values as a form would submit them: genres as a list of names,
+    booleans as bools (false-ish strings are False), the rest as strings.
+    """
+    record = {}
+    for name in rules.fields:
+        value = row.get(name)
+        if name == 'genres':
+            if isinstance(value, str):
+                value = [part.strip() for part in
+                         value.strip('{}').split(',') if part.strip()]
+            record[name] = [GENRE_NAMES.get(item, item)
+                            for item in value or ()]
+        elif name in rules.booleans:
+            record[name] = value is not None and \
+                str(value).strip().lower() not in FALSE_VALUES
+        else:
+            record[name] = '' if value is None else str(value)
+    return record
+
+
+def rules_validator(rules):
+    """
+    Validate a batch of rows with ``rules``, the checks the create views
+    apply, returning the column values of the valid rows.
+    """
+    def validate(batch):
+        records = [_record(row, rules) for _, row in batch]
+        valid, rejects = [], []
+        for (line, row), record, errors in zip(batch, records,
+                                               rules.validate(records)):
+            if errors:
+                rejects.append(Reject(line, row, errors))
+            else:
+                valid.append((line, record))
+        return valid, rejects
+    return validate
+
+
+def _existing_ids(model, ids):
+    if not ids:
+        return set()
+    return {id for id, in db.session.query(model.id).filter(
+        model.id.in_(ids))}
+
+
+def validate_shows(batch):
+    """
+    ShowForm's rules without its per-row lookups: the venue and artist
+    ids of the whole batch are checked with one query per table.
+    """
+    parsed, rejects = [], []
+    for line, row in batch:
+        errors = {}
+        values = {}
+        for name in ('venue_id', 'artist_id'):
+            try:
+                values[name] = int(row.get(name))
+            except (TypeError, ValueError):
+                errors[name] = ['Not a valid integer value.']
+        try:
+            values['start_time'] = datetime.fromisoformat(
+                str(row.get('start_time')).strip())
+        except ValueError:
+            errors['start_time'] = ['Not a valid datetime value.']
+        if errors:
+            rejects.append(Reject(line, row, errors))
+        else:
+            parsed.append((line, row, values))
+
+    venues = _existing_ids(Venue, {values['venue_id']
+                                   for _, _, values in parsed})
+    artists = _existing_ids(Artist, {values['artist_id']
+                                     for _, _, values in parsed})
+    valid = []
+    for line, row, values in parsed:
+        errors = {}
+        if values['venue_id'] not in venues:
+            errors['venue_id'] = ['Unknown venue.']
+        if values['artist_id'] not in artists:
+            errors['artist_id'] = ['Unknown artist.']
+        if errors:
+            rejects.append(Reject(line, row, errors))
+        else:
+            valid.append((line, values))
+    return valid, rejects
+
+
+VALIDATORS = {
+    'venues': (Venue, rules_validator(VENUE_RULES)),
+    'artists': (Artist, rules_validator(ARTIST_RULES)),
+    'shows': (Show, validate_shows),
+}
+
+
+#----------------------------------------------------------------------------#
+# Loading.
+#----------------------------------------------------------------------------#
+
+
+def _copy_text(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (list, tuple)):
+        value = '{' + ','.join(
+            '"' + str(item).replace('\\', '\\\\').replace('"', '\\"') + '"'
+            for item in value) + '}'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t') \
+        .replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copy_rows(cursor, table, columns, rows):
+    """COPY ``rows`` (tuples in ``columns`` order) into ``table``."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_text(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert('COPY "{}" ({}) FROM STDIN'.format(
+        table, ', '.join(columns)), buffer)
+
+
+def _insert(model, rows, method):
+    if method == 'copy':
+        columns = list(rows[0])
+        cursor = db.session.connection().connection.cursor()
+        copy_rows(cursor, model.__tablename__, columns,
+                  ([row[column] for column in columns] for row in rows))
+    else:
+        db.session.execute(model.__table__.insert(), rows)
+
+
+def _insert_each(model, rows):
+    """
+    Retry a failed batch row by row, so one row the database refuses
+    doesn't reject the rest.
+    """
+    rejects = []
+    for line, row in rows:
+        savepoint = db.session.begin_nested()
+        try:
+            db.session.execute(model.__table__.insert(), row)
+            savepoint.commit()
+        except DBAPIError as error:
+            savepoint.rollback()
+            rejects.append(Reject(line, row, {
+                'database': [str(error.orig).strip()]}))
+    return rejects
+
+
+def import_rows(kind, rows, rejects_file=None, batch_size=BATCH_SIZE,
+                method='copy', progress=None):
+    """
+    Validate and insert ``(line, row)`` pairs ``batch_size`` at a time,
+    committing each batch. Rejected rows are written to ``rejects_file``
+    as JSON lines.
+    """
+    model, validate = VALIDATORS[kind]
+    imported = rejected = 0
+    start = time.perf_counter()
+    for batch in _batches(rows, batch_size):
+        rejects = [Reject(line, row['_raw'], {'row': [row['_error']]})
+                   for line, row in batch if '_error' in row]
+        valid, invalid = validate([(line, row) for line, row in batch
+                                   if '_error' not in row])
+        rejects += invalid
+        failed = []
+        if valid:
+            try:
+                _insert(model, [values for _, values in valid], method)
+                db.session.commit()
+            except (DBAPIError, db.engine.dialect.dbapi.Error):
+                # COPY goes through the raw cursor, so its errors arrive
+                # unwrapped
+                db.session.rollback()
+                failed = _insert_each(model, valid)
+                db.session.commit()
+        rejects += failed
+        imported += len(valid) - len(failed)
+        rejected += len(rejects)
+        if rejects_file is not None:
+            for reject in rejects:
+                rejects_file.write(json.dumps(
+                    reject._asdict(), default=str) + '\n')
+        if progress is not None:
+            progress(imported, rejected, time.perf_counter() - start)
+    return ImportResult(imported, rejected, time.perf_counter() - start)
+
+
+def file_format(path):
+    """Import format implied by a file name, or None."""
+    extension = os.path.splitext(path)[1].lower()
+    return {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(
+        extension)
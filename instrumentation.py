@@ -0,0 +1,258 @@
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+#----------------------------------------------------------------------------#
+# Database instrumentation.
+#----------------------------------------------------------------------------#
+
+
+class PoolStats:
+    """
+    Checkout counts and wait times of a connection pool, logged and reset
+    every ``interval`` seconds.
+    """
+
+    def __init__(self, logger, interval=60):
+        self.logger = logger
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._logged_at = time.monotonic()
+        self._reset()
+
+    def _reset(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, pool, wait, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            now = time.monotonic()
+            if not self.interval or now - self._logged_at < self.interval:
+                return
+            self._logged_at = now
+            line = (pool.size(), pool.checkedout(), pool.overflow(),
+                    self.checkouts, self.timeouts,
+                    1000 * self.wait_total / self.checkouts,
+                    1000 * self.wait_max)
+            self._reset()
+        self.logger.info(
+            'size=%d checked_out=%d overflow=%d checkouts=%d timeouts=%d '
+            'wait_avg=%.1fms wait_max=%.1fms', *line)
+
+
+def timed_queue_pool(stats):
+    """A QueuePool class that records how long each checkout waited."""
+
+    class TimedQueuePool(QueuePool):
+        def _do_get(self):
+            start = time.perf_counter()
+            timed_out = False
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                timed_out = True
+                raise
+            finally:
+                stats.record(self, time.perf_counter() - start, timed_out)
+
+    return TimedQueuePool
+
+
+def init_app(app, db):
+    """
+    Time pool checkouts (logged every DB_POOL_STATS_INTERVAL seconds),
+    record each request's queries and log SQL_ECHO_SAMPLE_RATE of all
+    statements. Call after ``db.init_app``: the app's engines are created
+    here, with the timed pool, and instrumented one by one.
+    """
+    stats = PoolStats(app.logger.getChild('pool'),
+                      app.config.get('DB_POOL_STATS_INTERVAL', 60))
+    app.extensions['pool_stats'] = stats
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.setdefault('poolclass', timed_queue_pool(stats))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    init_request_recording(app)
+
+    sample_rate = app.config.get('SQL_ECHO_SAMPLE_RATE', 0)
+    # without DATABASE_URL the app still loads, for commands like `flask
+    # assets` that don't touch the database
+    binds = [None] if app.config.get('SQLALCHEMY_DATABASE_URI') else []
+    binds += list(app.config.get('SQLALCHEMY_BINDS') or {})
+    with app.app_context():
+        for bind in binds:
+            instrument_engine(db.get_engine(app, bind=bind), sample_rate,
+                              app.logger.getChild('sql'))
+
+
+def instrument_engine(engine, sample_rate=0, logger=None):
+    """
+    Time ``engine``'s statements for the active record_queries blocks and
+    log ``sample_rate`` of them to ``logger``.
+    """
+    event.listen(engine, 'before_cursor_execute', _start_query)
+    event.listen(engine, 'after_cursor_execute', _end_query)
+    event.listen(engine, 'handle_error', _failed_query)
+    if not sample_rate:
+        return
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def sample_statement(conn, cursor, statement, parameters, context,
+                         executemany):
+        if random.random() < sample_rate:
+            logger.info('%s %r', statement, parameters)
+
+
+#----------------------------------------------------------------------------#
+# Per-request query recording.
+#----------------------------------------------------------------------------#
+
+_recorders = ContextVar('query_recorders', default=())
+
+_PARAM_LIST = re.compile(
+    r'\(\s*(?:%\(\w+\)s|\?)(?:\s*,\s*(?:%\(\w+\)s|\?))*\s*\)')
+_PARAM = re.compile(r'%\(\w+\)s|\?')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """Statement shape with parameters, literals and IN lists collapsed."""
+    shape = _PARAM_LIST.sub('(?)', statement)
+    shape = _LITERAL.sub('?', _PARAM.sub('?', shape))
+    return _SPACE.sub(' ', shape).strip()
+
+
+class QueryRecorder:
+    """Counts, times and fingerprints the statements run while active."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def add(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold):
+        """Statement shapes run more than ``threshold`` times (N+1 suspects)."""
+        return {shape: count for shape, count in self.fingerprints.items()
+                if count > threshold}
+
+    def __enter__(self):
+        self._token = _recorders.set(_recorders.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info):
+        _recorders.reset(self._token)
+
+
+def record_queries():
+    """``with record_queries() as queries: ...`` then inspect ``queries``."""
+    return QueryRecorder()
+
+
+@contextmanager
+def assert_max_queries(limit, repeated=None):
+    """
+    Fail if the block runs more than ``limit`` statements, or any one
+    statement shape more than ``repeated`` times.
+    """
+    with record_queries() as queries:
+        yield queries
+    if queries.count > limit:
+        raise AssertionError(
+            f"{queries.count} queries run, expected at most {limit}:\n" +
+            '\n'.join(f'{count:>5} x {shape}'
+                      for shape, count in queries.fingerprints.most_common()))
+    suspects = queries.repeated(repeated) if repeated is not None else {}
+    if suspects:
+        raise AssertionError(
+            'N+1 pattern:\n' + '\n'.join(
+                f'{count:>5} x {shape}' for shape, count in suspects.items()))
+
+
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    if _recorders.get():
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    recorders = _recorders.get()
+    if recorders and conn.info.get('query_start'):
+        duration = time.perf_counter() - conn.info['query_start'].pop()
+        for recorder in recorders:
+            recorder.add(statement, duration)
+
+
+def _failed_query(context):
+    # after_cursor_execute doesn't run for a statement that raised, so its
+    # start time would otherwise be taken for the next one's
+    starts = context.connection is not None and \
+        context.connection.info.get('query_start')
+    if starts:
+        duration = time.perf_counter() - starts.pop()
+        for recorder in _recorders.get():
+            recorder.add(context.statement or '', duration)
+
+
+def init_request_recording(app):
+    """
+    Record every request's queries: add a Server-Timing header and log
+    requests that run more than SQL_MAX_QUERIES statements, spend more
+    than SQL_SLOW_MS in the database, or repeat a statement shape more
+    than N_PLUS_ONE_THRESHOLD times.
+    """
+    logger = app.logger.getChild('sql')
+    max_queries = app.config.get('SQL_MAX_QUERIES', 50)
+    slow_ms = app.config.get('SQL_SLOW_MS', 500)
+    n_plus_one = app.config.get('N_PLUS_ONE_THRESHOLD', 10)
+
+    @app.before_request
+    def start_recording():
+        g.request_started = time.perf_counter()
+        g.queries = record_queries().__enter__()
+
+    @app.after_request
+    def report_queries(response):
+        queries = g.get('queries')
+        if queries is None:
+            return response
+        db_ms = queries.duration * 1000
+        total_ms = (time.perf_counter() - g.request_started) * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.1f};desc="{queries.count} queries", '
+            f'app;dur={total_ms:.1f}')
+
+        suspects = queries.repeated(n_plus_one)
+        if queries.count > max_queries or db_ms > slow_ms or suspects:
+            logger.warning(
+                '%s %s: %d queries in %.1fms%s', request.method, request.path,
+                queries.count, db_ms, ''.join(
+                    f'\n  N+1? {count} x {shape}'
+                    for shape, count in suspects.items()))
+        return response
+
+    # Also runs when the view raised, so a failed request can't leave its
+    # recorder active on the worker thread.
+    @app.teardown_request
+    def stop_recording(exc):
+        queries = g.pop('queries', None)
+        if queries is not None:
+            queries.__exit__(None, None, None)
@@ -0,0 +1,45 @@
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+#----------------------------------------------------------------------------#
+# Relationship loading profiles.
+#----------------------------------------------------------------------------#
+
+# Relationships are lazy by default; each endpoint asks for what it needs.
+PROFILES = {
+    # columns only; touching any relationship raises
+    'bare': lambda model: [raiseload('*')],
+    # shows loaded up front in one extra IN query, e.g. for delete cascades
+    'with_shows': lambda model: [selectinload(model.shows)],
+    # shows joined into the same query, for pages rendering a few entities
+    'joined_shows': lambda model: [joinedload(model.shows)],
+}
+
+
+def profile(model, name):
+    """Loader options for ``model`` under the named profile."""
+    return PROFILES[name](model)
+
+
+class UnexpectedLazyLoad(RuntimeError):
+    pass
+
+
+def init_app(app, db):
+    """
+    With STRICT_LOADING on, any lazy relationship load during a request
+    raises UnexpectedLazyLoad.
+    """
+    if not app.config.get('STRICT_LOADING'):
+        return
+
+    @event.listens_for(db.session, 'do_orm_execute')
+    def check_lazy_load(state):
+        if not state.is_select or state.lazy_loaded_from is None or \
+                not has_request_context():
+            return
+        relationship = state.loader_strategy_path[-1]
+        raise UnexpectedLazyLoad(
+            f"{relationship} lazy loaded in {request.endpoint}; declare a "
+            f"loading profile for it")
@@ -0,0 +1,91 @@
+import threading
+import time
+
+from sqlalchemy import exists
+
+from models import db, Venue, Artist
+from search import search_artists, search_venues
+
+#----------------------------------------------------------------------------#
+# Cached id -> name lookups.
+#----------------------------------------------------------------------------#
+
+
+# Choices the show form's selects start with; its filters fetch the
+# rest from the choices endpoints.
+RECENT_CHOICES = 20
+
+
+class NameLookup:
+    """
+    The RECENT_CHOICES most recently added ``(id, name)`` pairs of a
+    model, newest first, loaded with one projected query and kept until
+    ``invalidate`` or ``ttl`` seconds pass; anything else is found with
+    ``search``, a LIMITed query of the model's trigram indexes.
+    """
+
+    def __init__(self, model, search, ttl=300):
+        self.model = model
+        self._search = search
+        self.ttl = ttl
+        self._choices = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def recent(self):
+        with self._lock:
+            if self._choices is not None and \
+                    time.monotonic() - self._loaded_at < self.ttl:
+                return self._choices
+            self._choices = [tuple(row) for row in db.session.query(
+                self.model.id, self.model.name
+            ).order_by(self.model.id.desc()).limit(RECENT_CHOICES)]
+            self._loaded_at = time.monotonic()
+            return self._choices
+
+    def choices(self, selected=None):
+        """
+        The recent pairs, and the ``selected`` id's (a form being shown
+        again) when it isn't one of them.
+        """
+        choices = self.recent()
+        if selected is None or selected in dict(choices):
+            return choices
+        name = db.session.query(self.model.name).filter(
+            self.model.id == selected).scalar()
+        return choices if name is None else [(selected, name)] + choices
+
+    def search(self, term, limit=RECENT_CHOICES):
+        if not (term or '').strip():
+            return self.recent()[:limit]
+        return [(row.id, row.name) for row in self._search(term, limit)]
+
+    def invalidate(self):
+        with self._lock:
+            self._choices = None
+
+
+def choices_response(choices):
+    return {
+        "count": len(choices),
+        "data": [{"id": id, "name": name} for id, name in choices]
+    }
+
+
+venues = NameLookup(Venue, search_venues)
+artists = NameLookup(Artist, search_artists)
+
+
+def init_app(app):
+    """Keep the recent choices for LOOKUP_TTL seconds."""
+    for lookup in (venues, artists):
+        lookup.ttl = app.config.get('LOOKUP_TTL', lookup.ttl)
+        lookup.invalidate()
+
+
+def show_references_exist(venue_id, artist_id):
+    """Whether the venue and the artist exist, in one primary key query."""
+    return db.session.query(
+        exists().where(Venue.id == venue_id),
+        exists().where(Artist.id == artist_id)
+    ).one()
@@ -0,0 +1,118 @@
+"""Add trigger-maintained venue summary for /venues
+
+Revision ID: 0b7e5f3c9a12
+Revises: c5d08b3e6f21
+Create Date: 2026-10-18 16:22:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7e5f3c9a12'
+down_revision = 'c5d08b3e6f21'
+branch_labels = None
+depends_on = None
+
+# Venue rows are mirrored one at a time; venue writes are rare.
+SYNC_VENUE = '''
+CREATE FUNCTION venue_summary_sync() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO "VenueSummary"
+            (venue_id, city, state, name, num_upcoming_shows, next_show_time)
+        VALUES (NEW.id, NEW.city, NEW.state, NEW.name, 0, NULL);
+    ELSE
+        UPDATE "VenueSummary"
+        SET city = NEW.city, state = NEW.state, name = NEW.name
+        WHERE venue_id = NEW.id;
+    END IF;
+    RETURN NULL;
+END
+$$
+'''
+
+# Show writes only flag the venues they touch, once per statement, so a
+# COPY of a million shows costs one UPDATE per batch rather than a
+# recount per row. The counts are redone with the application's clock
+# by queries.refresh_venue_summaries (see models.VenueSummary).
+INVALIDATE_VENUES = '''
+CREATE FUNCTION venue_summary_invalidate() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE "VenueSummary" SET next_show_time = '-infinity'
+        WHERE venue_id IN (SELECT venue_id FROM new_shows)
+          AND next_show_time IS DISTINCT FROM '-infinity';
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE "VenueSummary" SET next_show_time = '-infinity'
+        WHERE venue_id IN (SELECT venue_id FROM old_shows)
+          AND next_show_time IS DISTINCT FROM '-infinity';
+    END IF;
+    RETURN NULL;
+END
+$$
+'''
+
+TRIGGERS = [
+    'CREATE TRIGGER venue_summary_sync '
+    'AFTER INSERT OR UPDATE OF city, state, name ON "Venue" '
+    'FOR EACH ROW EXECUTE PROCEDURE venue_summary_sync()',
+    'CREATE TRIGGER show_summary_insert AFTER INSERT ON "Show" '
+    'REFERENCING NEW TABLE AS new_shows '
+    'FOR EACH STATEMENT EXECUTE PROCEDURE venue_summary_invalidate()',
+    'CREATE TRIGGER show_summary_update AFTER UPDATE ON "Show" '
+    'REFERENCING OLD TABLE AS old_shows NEW TABLE AS new_shows '
+    'FOR EACH STATEMENT EXECUTE PROCEDURE venue_summary_invalidate()',
+    'CREATE TRIGGER show_summary_delete AFTER DELETE ON "Show" '
+    'REFERENCING OLD TABLE AS old_shows '
+    'FOR EACH STATEMENT EXECUTE PROCEDURE venue_summary_invalidate()',
+]
+
+
+def upgrade():
+    op.create_table('VenueSummary',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=False),
+    sa.Column('state', sa.String(length=120), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('num_upcoming_shows', sa.Integer(), nullable=False),
+    sa.Column('next_show_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('venue_id')
+    )
+    op.create_index('ix_VenueSummary_city_state_name_venue_id',
+                    'VenueSummary', ['city', 'state', 'name', 'venue_id'],
+                    unique=False)
+    op.create_index('ix_VenueSummary_next_show_time', 'VenueSummary',
+                    ['next_show_time'], unique=False)
+    op.execute(SYNC_VENUE)
+    op.execute(INVALIDATE_VENUES)
+    for trigger in TRIGGERS:
+        op.execute(trigger)
+    # Counted as refresh_venue_summaries does, by the database's clock.
+    op.execute('''
+        INSERT INTO "VenueSummary"
+            (venue_id, city, state, name, num_upcoming_shows, next_show_time)
+        SELECT v.id, v.city, v.state, v.name, count(s.id), min(s.start_time)
+        FROM "Venue" v
+        LEFT JOIN "Show" s
+            ON s.venue_id = v.id AND s.start_time > LOCALTIMESTAMP
+        GROUP BY v.id
+    ''')
+
+
+def downgrade():
+    op.execute('DROP TRIGGER show_summary_delete ON "Show"')
+    op.execute('DROP TRIGGER show_summary_update ON "Show"')
+    op.execute('DROP TRIGGER show_summary_insert ON "Show"')
+    op.execute('DROP TRIGGER venue_summary_sync ON "Venue"')
+    op.execute('DROP FUNCTION venue_summary_invalidate()')
+    op.execute('DROP FUNCTION venue_summary_sync()')
+    op.drop_index('ix_VenueSummary_next_show_time', table_name='VenueSummary')
+    op.drop_index('ix_VenueSummary_city_state_name_venue_id',
+                  table_name='VenueSummary')
+    op.drop_table('VenueSummary')
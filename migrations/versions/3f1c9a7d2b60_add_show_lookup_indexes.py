@@ -0,0 +1,41 @@
+"""Add show lookup indexes
+
+Revision ID: 3f1c9a7d2b60
+Revises: 94d4640d4ef3
+Create Date: 2026-10-18 09:12:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b60'
+down_revision = '94d4640d4ef3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block; it
+    # builds the index without holding a write lock on "Show".
+    with op.get_context().autocommit_block():
+        op.create_index('ix_Show_venue_id_start_time', 'Show',
+                        ['venue_id', 'start_time'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_Show_artist_id_start_time', 'Show',
+                        ['artist_id', 'start_time'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_Show_start_time', 'Show',
+                        ['start_time'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_Show_start_time', table_name='Show',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_Show_artist_id_start_time', table_name='Show',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_Show_venue_id_start_time', table_name='Show',
+                      postgresql_concurrently=True)
@@ -0,0 +1,40 @@
+"""Add genre and location indexes for faceted browsing
+
+Revision ID: 5d2a8c41e7b9
+Revises: 0b7e5f3c9a12
+Create Date: 2026-10-18 17:05:12.840213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a8c41e7b9'
+down_revision = '0b7e5f3c9a12'
+branch_labels = None
+depends_on = None
+
+# GIN on the genre arrays serves ?genre= (@> and &&); (state, city)
+# serves ?state= and its per-city counts.
+INDEXES = [
+    ('ix_Venue_genres', 'Venue', ['genres'], 'gin'),
+    ('ix_Venue_state_city', 'Venue', ['state', 'city'], None),
+    ('ix_Artist_genres', 'Artist', ['genres'], 'gin'),
+    ('ix_Artist_state_city', 'Artist', ['state', 'city'], None),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, using in INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_using=using,
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, using in reversed(INDEXES):
+            op.drop_index(name, table_name=table,
+                          postgresql_concurrently=True)
@@ -0,0 +1,40 @@
+"""Add trigram search indexes
+
+Revision ID: 7a4e2d915c3b
+Revises: 3f1c9a7d2b60
+Create Date: 2026-10-18 10:41:07.918342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4e2d915c3b'
+down_revision = '3f1c9a7d2b60'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_Venue_name_trgm', 'Venue', 'name'),
+    ('ix_Venue_city_trgm', 'Venue', 'city'),
+    ('ix_Artist_name_trgm', 'Artist', 'name'),
+    ('ix_Artist_city_trgm', 'Artist', 'city'),
+]
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(name, table, [column], unique=False,
+                            postgresql_using='gin',
+                            postgresql_ops={column: 'gin_trgm_ops'},
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, column in reversed(INDEXES):
+            op.drop_index(name, table_name=table,
+                          postgresql_concurrently=True)
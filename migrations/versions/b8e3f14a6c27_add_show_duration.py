@@ -0,0 +1,40 @@
+"""Add show duration
+
+Revision ID: b8e3f14a6c27
+Revises: 5d2a8c41e7b9
+Create Date: 2026-10-18 19:22:41.503186
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3f14a6c27'
+down_revision = '5d2a8c41e7b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # a constant default is only recorded in the catalog, so existing
+    # shows get two hours without the table being rewritten
+    op.add_column('Show', sa.Column(
+        'duration', sa.Interval(), nullable=False,
+        server_default=sa.text("interval '2 hours'")))
+    # 12 hours is models.MAX_SHOW_DURATION. Added NOT VALID, so only
+    # new rows are checked while the ACCESS EXCLUSIVE lock is held ...
+    op.execute('ALTER TABLE "Show" ADD CONSTRAINT "ck_Show_duration" '
+               "CHECK (duration > interval '0' AND "
+               "duration <= interval '12 hours') NOT VALID")
+    # ... then, once that transaction has committed and released it,
+    # existing rows are checked under a lock that lets reads and writes
+    # through
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE "Show" VALIDATE CONSTRAINT '
+                   '"ck_Show_duration"')
+
+
+def downgrade():
+    op.drop_constraint('ck_Show_duration', 'Show', type_='check')
+    op.drop_column('Show', 'duration')
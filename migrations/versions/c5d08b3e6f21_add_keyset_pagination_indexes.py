@@ -0,0 +1,45 @@
+"""Add keyset pagination indexes
+
+Revision ID: c5d08b3e6f21
+Revises: 7a4e2d915c3b
+Create Date: 2026-10-18 13:05:52.337160
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d08b3e6f21'
+down_revision = '7a4e2d915c3b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        # (start_time, id) supersedes the plain start_time index.
+        op.create_index('ix_Show_start_time_id', 'Show',
+                        ['start_time', 'id'], unique=False,
+                        postgresql_concurrently=True)
+        op.drop_index('ix_Show_start_time', table_name='Show',
+                      postgresql_concurrently=True)
+        op.create_index('ix_Artist_name_id', 'Artist',
+                        ['name', 'id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_Venue_city_state_name_id', 'Venue',
+                        ['city', 'state', 'name', 'id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_Venue_city_state_name_id', table_name='Venue',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_Artist_name_id', table_name='Artist',
+                      postgresql_concurrently=True)
+        op.create_index('ix_Show_start_time', 'Show',
+                        ['start_time'], unique=False,
+                        postgresql_concurrently=True)
+        op.drop_index('ix_Show_start_time_id', table_name='Show',
+                      postgresql_concurrently=True)
@@ -0,0 +1,39 @@
+"""Add name prefix indexes for short search terms
+
+Revision ID: e2c71a9d4f08
+Revises: b8e3f14a6c27
+Create Date: 2026-10-18 21:14:36.207415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c71a9d4f08'
+down_revision = 'b8e3f14a6c27'
+branch_labels = None
+depends_on = None
+
+# Terms shorter than a trigram can't use the pg_trgm indexes; they match
+# names by prefix instead (search.py), along these. text_pattern_ops lets
+# LIKE 'ab%' use the index whatever the database's collation.
+INDEXES = [
+    ('ix_Venue_name_prefix', 'Venue'),
+    ('ix_Artist_name_prefix', 'Artist'),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table in INDEXES:
+            op.create_index(name, table,
+                            [sa.text('lower(name) text_pattern_ops')],
+                            unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table in reversed(INDEXES):
+            op.drop_index(name, table_name=table,
+                          postgresql_concurrently=True)
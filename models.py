@@ -1,6 +1,11 @@
-from flask_sqlalchemy import SQLAlchemy
+from datetime import timedelta
 
-db = SQLAlchemy()
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.hybrid import hybrid_property
+
+from routing import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -12,13 +17,24 @@ class Venue(db.Model):
     Venue model
     """
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Venue_city_trgm', 'city', postgresql_using='gin',
+                 postgresql_ops={'city': 'gin_trgm_ops'}),
+        db.Index('ix_Venue_name_prefix',
+                 db.text('lower(name) text_pattern_ops')),
+        db.Index('ix_Venue_city_state_name_id', 'city', 'state', 'name', 'id'),
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+        db.Index('ix_Venue_state_city', 'state', 'city'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120), nullable=False)
-    genres = db.Column("genres", db.ARRAY(db.String()), nullable=False)
+    genres = db.Column("genres", ARRAY(db.String()), nullable=False)
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(
         500), default="https://cdn.pixabay.com/photo/2017/08/08/01/22/architecture-2610006_1280.jpg")
@@ -29,7 +45,7 @@ class Venue(db.Model):
 
     shows = db.relationship('Show',
                             backref='venue',
-                            lazy='joined',
+                            lazy='select',
                             cascade="all, delete")
 
     def __repr__(self):
@@ -41,13 +57,24 @@ class Artist(db.Model):
     Artist model
     """
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Artist_city_trgm', 'city', postgresql_using='gin',
+                 postgresql_ops={'city': 'gin_trgm_ops'}),
+        db.Index('ix_Artist_name_prefix',
+                 db.text('lower(name) text_pattern_ops')),
+        db.Index('ix_Artist_name_id', 'name', 'id'),
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+        db.Index('ix_Artist_state_city', 'state', 'city'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column("genres", db.ARRAY(db.String()), nullable=False)
+    genres = db.Column("genres", ARRAY(db.String()), nullable=False)
     image_link = db.Column(db.String(
         500), default="https://cdn.pixabay.com/photo/2015/10/05/22/37/blank-profile-picture-973460_1280.png")
     facebook_link = db.Column(db.String(120), default="")
@@ -57,24 +84,87 @@ class Artist(db.Model):
 
     shows = db.relationship('Show',
                             backref='artist',
-                            lazy='joined',
+                            lazy='select',
                             cascade="all, delete")
 
     def __repr__(self):
         return f'<Artist ID: {self.id}, name: {self.name}>'
 
 
+# Shows last DEFAULT_SHOW_DURATION unless booked for longer, and at most
+# MAX_SHOW_DURATION (checked by ck_Show_duration): with that bound,
+# bookings.py finds overlapping shows with a range scan of the
+# (venue_id, start_time) and (artist_id, start_time) indexes.
+DEFAULT_SHOW_DURATION = timedelta(hours=2)
+MAX_SHOW_DURATION = timedelta(hours=12)
+
+
+def _interval(duration):
+    """A Postgres interval literal for a timedelta of whole seconds."""
+    return "interval '{:d} seconds'".format(int(duration.total_seconds()))
+
+
 class Show(db.Model):
     """
     Show model
     """
     __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+        # the migration adding it (b8e3f14a6c27) spells out the same bound
+        db.CheckConstraint("duration > interval '0' AND duration <= " +
+                           _interval(MAX_SHOW_DURATION),
+                           name='ck_Show_duration'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime, nullable=False)
+    duration = db.Column(db.Interval, nullable=False,
+                         default=DEFAULT_SHOW_DURATION,
+                         server_default=db.text(
+                             _interval(DEFAULT_SHOW_DURATION)))
     artist_id = db.Column(db.Integer, db.ForeignKey(
         'Artist.id'), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
 
+    @hybrid_property
+    def end_time(self):
+        return self.start_time + self.duration
+
     def __repr__(self):
         return f'<Show ID: {self.id}, Artist ID: {self.artist_id}, Venue ID: {self.venue_id}>'
+
+
+class VenueSummary(db.Model):
+    """
+    One row per venue for the /venues rollup, kept in sync by database
+    triggers (see migration 0b7e5f3c9a12): venue name/area changes are
+    copied over, and show writes mark the venue's upcoming count stale by
+    setting ``next_show_time`` to -infinity. A count also goes stale once
+    ``next_show_time``, its earliest upcoming show, has passed. Reading
+    the page never writes (it may run on a replica): the stale rows it
+    lists are recounted in the query. They are stored again after a show
+    is booked through the app or imported, and by `flask refresh-venues`,
+    best run every minute or so (cron, a systemd timer) so that the
+    counts going stale with time don't each cost a recount per read.
+    """
+    __tablename__ = 'VenueSummary'
+    __table_args__ = (
+        db.Index('ix_VenueSummary_city_state_name_venue_id',
+                 'city', 'state', 'name', 'venue_id'),
+        db.Index('ix_VenueSummary_next_show_time', 'next_show_time'),
+    )
+
+    venue_id = db.Column(db.Integer,
+                         db.ForeignKey('Venue.id', ondelete='CASCADE'),
+                         primary_key=True)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    name = db.Column(db.String, nullable=False)
+    num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0)
+    next_show_time = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<VenueSummary Venue ID: {self.venue_id}, upcoming: {self.num_upcoming_shows}>'
@@ -0,0 +1,137 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Encode a sort key tuple as an opaque, URL-safe token."""
+    values = [{"dt": value.isoformat()} if isinstance(value, datetime)
+              else value for value in values]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _python_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def _matches(value, column):
+    if value is None:
+        return getattr(column, 'nullable', True)
+    expected = _python_type(column)
+    if expected is None:
+        return True
+    # JSON has no separate bool or integral float to confuse with an int
+    if expected is int:
+        return type(value) is int
+    return isinstance(value, expected)
+
+
+def decode_cursor(token, columns=None):
+    """
+    The sort key tuple encoded in ``token``. With ``columns``, it must
+    have one value of each column's Python type, so a tampered cursor
+    fails here rather than in the database.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+        cursor = tuple(datetime.fromisoformat(value["dt"])
+                       if isinstance(value, dict) else value
+                       for value in values)
+    except (ValueError, TypeError, KeyError) as ex:
+        raise InvalidCursor(token) from ex
+    if columns is not None and (
+            len(cursor) != len(columns) or
+            not all(map(_matches, cursor, columns))):
+        raise InvalidCursor(token)
+    return cursor
+
+
+def page_size(value):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+class Page:
+    """
+    One page of a keyset-paginated query.
+
+    ``next_cursor``/``prev_cursor`` are None when there is nothing further
+    in that direction.
+    """
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def paginate(query, columns, after=None, before=None, limit=PAGE_SIZE,
+             descending=False):
+    """
+    Keyset-paginate ``query`` ordered by ``columns``.
+
+    ``columns`` must make the ordering unique (end it with the primary
+    key) and be backed by an index in the same order. Rows must expose
+    each column under its own name so the key of the last row can be
+    turned into the next cursor. ``after``/``before`` are cursors from a
+    previous page; only one of them is used.
+    """
+    key = tuple_(*columns)
+    names = [column.key for column in columns]
+    forward = not before
+    token = after if forward else before
+    cursor = decode_cursor(token, columns) if token else None
+
+    # Walking backwards reverses the ordering; rows are flipped back below.
+    ascending = forward != descending
+    if cursor is not None:
+        query = query.filter(key > tuple_(*cursor) if ascending
+                             else key < tuple_(*cursor))
+    query = query.order_by(*[column.asc() if ascending else column.desc()
+                             for column in columns])
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+
+    def cursor_of(row):
+        return encode_cursor([getattr(row, name) for name in names])
+
+    if not rows:
+        return Page(rows)
+    if forward:
+        return Page(rows,
+                    next_cursor=cursor_of(rows[-1]) if has_more else None,
+                    prev_cursor=cursor_of(rows[0]) if cursor else None)
+    return Page(rows,
+                next_cursor=cursor_of(rows[-1]),
+                prev_cursor=cursor_of(rows[0]) if has_more else None)
@@ -0,0 +1,281 @@
+from datetime import datetime
+from itertools import groupby
+from operator import attrgetter
+
+from sqlalchemy import case, func, select, update
+
+from facets import clauses
+from models import db, Venue, Artist, Show, VenueSummary
+from pagination import PAGE_SIZE, paginate
+
+# Shows listed on either side of a detail page; the page still shows the
+# full counts.
+PAST_SHOWS_LIMIT = 20
+UPCOMING_SHOWS_LIMIT = 100
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+# Read queries run on ``session`` when one is given, db.session otherwise;
+# asgi.py passes the synchronous side of its AsyncSession.
+
+
+def _upcoming_count(entity, show_key, now):
+    return select(func.count(Show.id)).where(
+        show_key == entity.id, Show.start_time > now
+    ).correlate(entity).scalar_subquery().label('num_upcoming_shows')
+
+
+def _entity_columns(entity, show_key, now):
+    """Selectable fields of a venue or artist listing, by name."""
+    columns = {column.key: column for column in entity.__table__.columns}
+    columns['num_upcoming_shows'] = _upcoming_count(entity, show_key, now)
+    return columns
+
+
+VENUE_FIELDS = [column.key for column in Venue.__table__.columns] + \
+    ['num_upcoming_shows']
+ARTIST_FIELDS = [column.key for column in Artist.__table__.columns] + \
+    ['num_upcoming_shows']
+SHOW_FIELDS = ['id', 'start_time', 'venue_id', 'venue_name',
+               'venue_image_link', 'artist_id', 'artist_name',
+               'artist_image_link']
+
+
+def _listing(columns, fields, sort, after, before, limit, where=(),
+             session=None):
+    """
+    Keyset page of ``fields`` (every column by default) from ``columns``;
+    sort key columns are selected too, since cursors are built from them.
+    """
+    names = list(fields or columns)
+    names += [column.key for column in sort if column.key not in names]
+    query = (session or db.session).query(
+        *[columns[name] for name in names]).filter(*where)
+    return paginate(query, sort, after, before, limit)
+
+
+def venue_listing(after=None, before=None, limit=PAGE_SIZE, fields=None,
+                  now=None, filters=None, session=None):
+    """
+    A page of venues in area order, projected to ``fields`` and narrowed
+    to the browse ``filters``.
+    """
+    columns = _entity_columns(Venue, Show.venue_id, now or datetime.now())
+    return _listing(columns, fields,
+                    [Venue.city, Venue.state, Venue.name, Venue.id],
+                    after, before, limit, clauses(Venue, filters), session)
+
+
+def refresh_venue_summaries(now=None, everything=False, session=None):
+    """
+    Recount the upcoming shows of the VenueSummary rows that went stale:
+    flagged by a show write, or past their earliest upcoming show. Uses
+    the same ``now`` as the pages, and the (venue_id, start_time) index.
+    Returns how many rows were refreshed.
+    """
+    now = now or datetime.now()
+    session = session or db.session
+
+    def upcoming(aggregate):
+        return select(aggregate).where(
+            Show.venue_id == VenueSummary.venue_id, Show.start_time > now
+        ).scalar_subquery()
+
+    statement = update(VenueSummary).values(
+        num_upcoming_shows=upcoming(func.count(Show.id)),
+        next_show_time=upcoming(func.min(Show.start_time)))
+    if not everything:
+        statement = statement.where(VenueSummary.next_show_time <= now)
+    refreshed = session.execute(
+        statement.execution_options(synchronize_session=False)).rowcount
+    session.commit()
+    return refreshed
+
+
+def venue_areas(after=None, before=None, limit=PAGE_SIZE, now=None,
+                filters=None, session=None):
+    """
+    A page of venues grouped by city/state with their upcoming show counts.
+
+    Unfiltered, reads the trigger-maintained VenueSummary table along its
+    (city, state, name, venue_id) index, so the page costs the same
+    whatever the number of shows; the stale rows on the page (see
+    VenueSummary) are recounted from Show as they are read, without
+    storing the counts, which refresh_venue_summaries does. Filtered
+    pages come from Venue, whose genre and (state, city) indexes narrow
+    the rows to count. Rows are ordered by area, so they are bucketed in
+    one pass.
+    """
+    now = now or datetime.now()
+    if filters:
+        page = venue_listing(after, before, limit,
+                             ['city', 'state', 'name', 'id',
+                              'num_upcoming_shows'], now, filters, session)
+    else:
+        recount = select(func.count(Show.id)).where(
+            Show.venue_id == VenueSummary.venue_id, Show.start_time > now
+        ).correlate(VenueSummary).scalar_subquery()
+        query = (session or db.session).query(
+            VenueSummary.city,
+            VenueSummary.state,
+            VenueSummary.name,
+            VenueSummary.venue_id,
+            case((VenueSummary.next_show_time <= now, recount),
+                 else_=VenueSummary.num_upcoming_shows
+                 ).label('num_upcoming_shows')
+        )
+        page = paginate(query, [VenueSummary.city, VenueSummary.state,
+                                VenueSummary.name, VenueSummary.venue_id],
+                        after, before, limit)
+    venue_id = attrgetter('id' if filters else 'venue_id')
+    page.items = [
+        {
+            "city": city,
+            "state": state,
+            "venues": [{"id": venue_id(venue), "name": venue.name,
+                        "num_upcoming_shows": venue.num_upcoming_shows}
+                       for venue in venues]
+        }
+        for (city, state), venues in groupby(
+            page.items, key=lambda row: (row.city, row.state))
+    ]
+    return page
+
+
+def artist_listing(after=None, before=None, limit=PAGE_SIZE,
+                   fields=('id', 'name'), now=None, filters=None,
+                   session=None):
+    """
+    A page of artists in name order, projected to ``fields`` and narrowed
+    to the browse ``filters``.
+    """
+    columns = _entity_columns(Artist, Show.artist_id, now or datetime.now())
+    return _listing(columns, fields, [Artist.name, Artist.id],
+                    after, before, limit, clauses(Artist, filters), session)
+
+
+def show_listing(after=None, before=None, limit=PAGE_SIZE, fields=None,
+                 session=None):
+    """
+    Most recent shows first, projected to ``fields`` (by default all of
+    SHOW_FIELDS, the columns /shows renders). Venue and Artist are only
+    joined when a field needs them.
+    """
+    columns = {
+        'id': Show.id,
+        'start_time': Show.start_time,
+        'venue_id': Show.venue_id,
+        'venue_name': Venue.name.label('venue_name'),
+        'venue_image_link': Venue.image_link.label('venue_image_link'),
+        'artist_id': Show.artist_id,
+        'artist_name': Artist.name.label('artist_name'),
+        'artist_image_link': Artist.image_link.label('artist_image_link'),
+    }
+    names = list(fields or SHOW_FIELDS)
+    names += [name for name in ('start_time', 'id') if name not in names]
+    query = (session or db.session).query(
+        *[columns[name] for name in names]).select_from(Show)
+    if any(name.startswith('venue_') and name != 'venue_id'
+           for name in names):
+        query = query.join(Venue, Show.venue_id == Venue.id)
+    if any(name.startswith('artist_') and name != 'artist_id'
+           for name in names):
+        query = query.join(Artist, Show.artist_id == Artist.id)
+    return paginate(query, [Show.start_time, Show.id], after, before, limit,
+                    descending=True)
+
+
+def show_export(start=None, end=None, venue_id=None, artist_id=None):
+    """
+    Core select of every show in ``[start, end)``, optionally of one venue
+    or artist, in start time order so it streams straight off the
+    (start_time, id) index.
+    """
+    statement = select(
+        Show.id.label('show_id'),
+        Show.start_time,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Venue.city.label('venue_city'),
+        Venue.state.label('venue_state'),
+        Show.artist_id,
+        Artist.name.label('artist_name')
+    ).join_from(
+        Show, Venue, Show.venue_id == Venue.id
+    ).join(
+        Artist, Show.artist_id == Artist.id
+    )
+    if start is not None:
+        statement = statement.where(Show.start_time >= start)
+    if end is not None:
+        statement = statement.where(Show.start_time < end)
+    if venue_id is not None:
+        statement = statement.where(Show.venue_id == venue_id)
+    if artist_id is not None:
+        statement = statement.where(Show.artist_id == artist_id)
+    return statement.order_by(Show.start_time, Show.id)
+
+
+def _show_history(entity, entity_id, show_key, other, other_key,
+                  other_columns, now, past_limit, upcoming_limit, shows=True,
+                  session=None):
+    """
+    Detail page data for a venue or artist: the entity's columns, its
+    past/upcoming show counts (one aggregate query) and the projected
+    shows on each side of ``now``, limited to the next ``upcoming_limit``
+    and the most recent ``past_limit``. ``shows=False`` stops at the
+    counts. The shows are lists, read before a streamed page starts, so
+    no connection is held while it is sent.
+    """
+    session = session or db.session
+
+    def count(condition):
+        return select(func.count(Show.id)).where(
+            show_key == entity.id, condition
+        ).correlate(entity).scalar_subquery()
+
+    row = session.query(
+        *entity.__table__.columns,
+        count(Show.start_time > now).label('upcoming_shows_count'),
+        count(Show.start_time <= now).label('past_shows_count')
+    ).filter(entity.id == entity_id).first()
+    if row is None:
+        return None
+    data = dict(row._mapping)
+    if not shows:
+        return data
+
+    history = session.query(Show.start_time, *other_columns).join(
+        other, other_key == other.id
+    ).filter(show_key == entity_id)
+    upcoming = history.filter(Show.start_time > now).order_by(
+        Show.start_time, Show.id).limit(upcoming_limit)
+    past = history.filter(Show.start_time <= now).order_by(
+        Show.start_time.desc(), Show.id.desc()).limit(past_limit)
+    data["upcoming_shows"] = [dict(show._mapping) for show in upcoming]
+    data["past_shows"] = [dict(show._mapping) for show in past]
+    return data
+
+
+def venue_detail(venue_id, past_limit=PAST_SHOWS_LIMIT,
+                 upcoming_limit=UPCOMING_SHOWS_LIMIT, now=None, shows=True,
+                 session=None):
+    return _show_history(
+        Venue, venue_id, Show.venue_id, Artist, Show.artist_id,
+        [Artist.id.label('artist_id'),
+         Artist.name.label('artist_name'),
+         Artist.image_link.label('artist_image_link')],
+        now or datetime.now(), past_limit, upcoming_limit, shows, session)
+
+
+def artist_detail(artist_id, past_limit=PAST_SHOWS_LIMIT,
+                  upcoming_limit=UPCOMING_SHOWS_LIMIT, now=None, shows=True,
+                  session=None):
+    return _show_history(
+        Artist, artist_id, Show.artist_id, Venue, Show.venue_id,
+        [Venue.id.label('venue_id'),
+         Venue.name.label('venue_name'),
+         Venue.image_link.label('venue_image_link')],
+        now or datetime.now(), past_limit, upcoming_limit, shows, session)
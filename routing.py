@@ -0,0 +1,190 @@
+import itertools
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import event, exc, orm, text
+
+#----------------------------------------------------------------------------#
+# Read replica routing.
+#----------------------------------------------------------------------------#
+
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# query_canceled: a statement stopped by statement_timeout (or a cancel
+# request) failed on a replica that is fine.
+QUERY_CANCELED = '57014'
+
+# Replication delay of a standby; 0 on a primary, or once a standby has
+# replayed everything it received (an idle primary sends nothing, so the
+# last replayed transaction can be old without the standby being behind).
+LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+             OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+class ReplicaSet:
+    """
+    Round-robin over the replica binds, skipping any that failed its last
+    health check. A replica is checked again once ``interval`` seconds
+    have passed since its previous check, and is unhealthy while it can't
+    be reached or lags more than ``max_lag`` seconds behind.
+    """
+
+    def __init__(self, binds, interval=10, max_lag=5):
+        self.binds = list(binds)
+        self.interval = interval
+        self.max_lag = max_lag
+        self.status = {bind: {'healthy': True, 'lag': None, 'error': None,
+                              'checked_at': None} for bind in self.binds}
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self, engine_of):
+        """The next healthy replica bind, or None to read from the primary."""
+        for _ in self.binds:
+            bind = self.binds[next(self._turn) % len(self.binds)]
+            if self._due(bind):
+                self.check(bind, engine_of(bind))
+            if self.status[bind]['healthy']:
+                return bind
+        return None
+
+    def _due(self, bind):
+        # one request per interval runs the check; the others go on with
+        # the last result
+        with self._lock:
+            checked_at = self.status[bind]['checked_at']
+            now = time.monotonic()
+            if checked_at is not None and now - checked_at < self.interval:
+                return False
+            self.status[bind]['checked_at'] = now
+            return True
+
+    def check(self, bind, engine):
+        status = self.status[bind]
+        try:
+            with engine.connect() as connection:
+                lag = connection.execute(LAG_SQL).scalar()
+        except exc.DBAPIError as error:
+            status.update(healthy=False, lag=None, error=str(error.orig))
+        except (exc.SQLAlchemyError, OSError) as error:
+            status.update(healthy=False, lag=None, error=str(error))
+        else:
+            if lag is None:
+                # a standby that hasn't replayed a transaction since it
+                # started: how far behind it is can't be told
+                status.update(healthy=False, lag=None,
+                              error='replication lag unknown')
+            else:
+                lag = float(lag)
+                status.update(healthy=lag <= self.max_lag, lag=lag,
+                              error=None)
+        status['checked_at'] = time.monotonic()
+        return status
+
+    def mark_down(self, bind, error):
+        """Take ``bind`` out of rotation until its next health check."""
+        self.status[bind].update(healthy=False, error=str(error),
+                                 checked_at=time.monotonic())
+
+
+def read_primary(view):
+    """Serve the decorated GET view from the primary, e.g. edit forms."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_primary = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def read_only(view):
+    """Let a view answering another method read from a replica, e.g. search."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _reads_from_replica():
+    return has_request_context() and not g.get('read_primary') and \
+        (request.method in SAFE_METHODS or g.get('read_only', False))
+
+
+class RoutingSession(SignallingSession):
+    """
+    Sends the reads of GET (and ``read_only``) requests to a replica and
+    everything else to the primary: writes, flushes, requests with other
+    methods, and work outside a request (CLI commands, the importer).
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        replicas = self.app.extensions.get('replicas')
+        writing = self._flushing or getattr(clause, 'is_dml', False)
+        if writing and has_request_context():
+            g.wrote = True
+        if replicas is None or writing or not _reads_from_replica():
+            return super().get_bind(mapper, clause)
+
+        db = get_state(self.app).db
+        # one replica per request, so its queries see the same snapshot
+        if 'replica' not in g:
+            g.replica = replicas.choose(
+                lambda bind: db.get_engine(self.app, bind=bind))
+        bind = g.replica
+        if bind is None:
+            return super().get_bind(mapper, clause)
+        return db.get_engine(self.app, bind=bind)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def init_app(app, db):
+    """
+    Route GET requests' reads to the SQLALCHEMY_BINDS replica entries, if
+    any. A client that wrote something reads from the primary for the
+    next READ_YOUR_WRITES_SECONDS, so the page it is redirected to shows
+    its change even while the replicas catch up.
+    """
+    binds = [bind for bind in app.config.get('SQLALCHEMY_BINDS') or {}
+             if bind.startswith('replica_')]
+    if not binds:
+        return
+    replicas = ReplicaSet(binds, app.config.get('REPLICA_CHECK_INTERVAL', 10),
+                          app.config.get('REPLICA_MAX_LAG_SECONDS', 5))
+    app.extensions['replicas'] = replicas
+    window = app.config.get('READ_YOUR_WRITES_SECONDS', 10)
+
+    with app.app_context():
+        for bind in binds:
+            engine = db.get_engine(app, bind=bind)
+
+            @event.listens_for(engine, 'handle_error')
+            def take_out_of_rotation(context, bind=bind):
+                error = context.original_exception
+                if getattr(error, 'pgcode', None) == QUERY_CANCELED:
+                    return
+                if context.is_disconnect or isinstance(
+                        context.sqlalchemy_exception, exc.OperationalError):
+                    replicas.mark_down(bind, error)
+
+    @app.before_request
+    def pin_to_primary():
+        if session.get('read_primary_until', 0) > time.time():
+            g.read_primary = True
+
+    @app.after_request
+    def remember_write(response):
+        if request.method not in SAFE_METHODS and g.get('wrote'):
+            session['read_primary_until'] = time.time() + window
+        return response
@@ -0,0 +1,86 @@
+from sqlalchemy import Float, case, cast, func, or_
+
+from facets import GENRES, genre_clause
+from models import db, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Shorter terms have no trigram to look up in the pg_trgm indexes, and
+# would scan every name: they match names by prefix instead.
+TRIGRAM_MIN_LENGTH = 3
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def clamp_limit(limit):
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _search(model, term, limit, session=None):
+    """
+    Rank ``model`` rows against ``term`` using the pg_trgm indexes on
+    name and city, or for a term shorter than a trigram, the names it
+    starts, along the lower(name) index; a genre, as either spelling
+    facets.GENRES knows, also matches the genres array.
+    """
+    term = (term or '').strip()
+    if not term:
+        return []
+
+    if len(term) < TRIGRAM_MIN_LENGTH:
+        prefix = f"{_escape_like(term.lower())}%"
+        matches = [func.lower(model.name).like(prefix)]
+        # a float like word_similarity's, not a numeric
+        ranks = [cast(case((matches[0], 1), else_=0), Float)]
+    else:
+        pattern = f"%{_escape_like(term)}%"
+        matches = [
+            model.name.ilike(pattern),
+            model.name.op('%>')(term),
+            model.city.ilike(pattern),
+        ]
+        ranks = [
+            func.word_similarity(term, model.name),
+            func.similarity(model.city, term) * 0.5,
+        ]
+    genre = GENRES.get(term.lower())
+    if genre is not None:
+        has_genre = genre_clause(model, genre)
+        matches.append(has_genre)
+        ranks.append(case((has_genre, 0.5), else_=0))
+
+    rank = func.greatest(*ranks).label('rank')
+    return (session or db.session).query(
+        model.id, model.name, model.city, model.state, rank
+    ).filter(
+        or_(*matches)
+    ).order_by(
+        rank.desc(), model.name, model.id
+    ).limit(clamp_limit(limit)).all()
+
+
+def search_venues(term, limit=DEFAULT_LIMIT, session=None):
+    return _search(Venue, term, limit, session)
+
+
+def search_artists(term, limit=DEFAULT_LIMIT, session=None):
+    return _search(Artist, term, limit, session)
+
+
+def typeahead_response(rows):
+    return {
+        "count": len(rows),
+        "data": [{"id": row.id, "name": row.name, "city": row.city,
+                  "state": row.state, "rank": round(row.rank, 3)}
+                 for row in rows]
+    }
@@ -0,0 +1,127 @@
+import sys
+from datetime import datetime
+
+from flask import (Blueprint, abort, flash, render_template, request,
+                   Response)
+
+from cache import add_cache_tags, page_cache
+from models import db, Show
+from pagination import InvalidCursor
+from queries import refresh_venue_summaries, show_listing
+from templating import stream_template
+from views import page_args
+import export
+import lookups
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+# The form views import forms (and with it WTForms) when first called, so
+# starting a worker or a CLI command doesn't.
+blueprint = Blueprint('shows', __name__)
+
+
+@blueprint.route('/shows')
+@page_cache.cached('shows')
+def shows():
+    # displays a page of shows at /shows, most recent first
+    try:
+        page = show_listing(**page_args())
+    except InvalidCursor:
+        abort(400)
+    for show in page:
+        add_cache_tags(f"venue:{show.venue_id}", f"artist:{show.artist_id}")
+
+    data = ({
+        "venue_id": show.venue_id,
+        "venue_name": show.venue_name,
+        "artist_id": show.artist_id,
+        "artist_name": show.artist_name,
+        "artist_image_link": show.artist_image_link,
+        "start_time": show.start_time
+    } for show in page)
+
+    return stream_template('pages/shows.html', shows=data, page=page)
+
+
+def export_args():
+    """Date range and venue/artist filters of an export request."""
+    parsers = {
+        "start": ('from', datetime.fromisoformat),
+        "end": ('to', datetime.fromisoformat),
+        "venue_id": ('venue_id', int),
+        "artist_id": ('artist_id', int),
+    }
+    try:
+        return {name: parse(request.args[arg]) if request.args.get(arg)
+                else None for name, (arg, parse) in parsers.items()}
+    except ValueError:
+        abort(400)
+
+
+@blueprint.route('/shows/export.<any(csv, jsonl):format>')
+def export_shows(format):
+    # streamed a chunk at a time off a server-side cursor; never cached
+    response = Response(
+        export.export_shows(db.engine, format, **export_args()),
+        mimetype=export.MIMETYPES[format])
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename=shows.{format}'
+    return response
+
+
+#  Create Show
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/shows/create')
+def create_shows():
+    from forms import ShowForm
+
+    # renders form. do not touch.
+    form = ShowForm(venues=lookups.venues.choices(),
+                    artists=lookups.artists.choices())
+    return render_template('forms/new_show.html', form=form)
+
+
+@blueprint.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    from forms import ShowForm
+
+    form = ShowForm(request.form, venues=lookups.venues.choices(
+                        request.form.get('venue_id', type=int)),
+                    artists=lookups.artists.choices(
+                        request.form.get('artist_id', type=int)))
+
+    try:
+        if form.validate():
+            form_data = form.data
+            form_data.pop('csrf_token', None)
+            end_time = form_data.pop('end_time')
+            if end_time is not None:
+                form_data['duration'] = end_time - form_data['start_time']
+            show = Show(**form_data)
+            db.session.add(show)
+            db.session.commit()
+            # the insert flagged the venue's /venues count as stale
+            refresh_venue_summaries()
+            page_cache.invalidate('shows',
+                                  f"venue:{form_data['venue_id']}",
+                                  f"artist:{form_data['artist_id']}")
+            flash("Show was successfully created!")
+        else:
+            print("errors: ", form.errors)
+            flash("Form validation failed  Show could not be created")
+            for error in form.start_time.errors + form.end_time.errors:
+                flash(error)
+            return render_template('forms/new_show.html', form=form)
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+        flash('An error occurred. Venue could not be created.')
+        return render_template('forms/new_show.html', form=form)
+    finally:
+        db.session.close()
+
+    return render_template('pages/home.html')
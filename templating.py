@@ -0,0 +1,179 @@
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+from flask import current_app, get_flashed_messages, stream_with_context
+from jinja2 import FileSystemBytecodeCache
+
+#----------------------------------------------------------------------------#
+# Template compilation.
+#----------------------------------------------------------------------------#
+
+EXTENSIONS = ['html']
+# Streamed pages are sent in pieces of about this many characters.
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+class BytecodeCache(FileSystemBytecodeCache):
+    """
+    Compiled templates on disk, shared by the workers of a host so only
+    the first to boot after a deploy compiles them. Jinja writes cache
+    files in place; workers booting together would read each other's
+    half-written files, so they are written aside and renamed instead.
+    """
+
+    def load_bytecode(self, bucket):
+        try:
+            super().load_bytecode(bucket)
+        except (EOFError, ValueError, TypeError):
+            # unreadable: compile from source and write it again
+            bucket.reset()
+
+    def dump_bytecode(self, bucket):
+        filename = self._get_cache_filename(bucket)
+        fd, temporary = tempfile.mkstemp(dir=self.directory,
+                                         suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                bucket.write_bytecode(file)
+            os.replace(temporary, filename)
+        except OSError:
+            # a read-only or full disk costs a compile, not the request
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+
+
+def _coalesce(pieces, size):
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_template(name, **context):
+    """
+    render_template as a streamed response: the page is sent as the
+    template renders it and is never held whole. Runs in the request
+    context until the last chunk is sent, but after the headers: the
+    Server-Timing header and the slow request log don't see statements
+    run while streaming, and a connection used then stays checked out
+    until the client has the page. Views pass rows already read.
+    """
+    # the session cookie goes out with the headers, so the flashes the
+    # layout shows are taken off it now (and kept for the template)
+    get_flashed_messages()
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    template = app.jinja_env.get_or_select_template(name)
+    return app.response_class(stream_with_context(
+        _coalesce(template.generate(context), STREAM_CHUNK_SIZE)))
+
+
+def template_names(app):
+    return app.jinja_env.list_templates(extensions=EXTENSIONS)
+
+
+def warm(app):
+    """
+    Load every template into the environment's cache, from the bytecode
+    cache where it can; the number of templates loaded.
+    """
+    names = template_names(app)
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def compile_times(app):
+    """Template name -> seconds taken to compile it from source."""
+    env = app.jinja_env
+    times = {}
+    for name in template_names(app):
+        source, filename, _ = env.loader.get_source(env, name)
+        start = time.perf_counter()
+        env.compile(source, name, filename)
+        times[name] = time.perf_counter() - start
+    return times
+
+
+def render_times(app, requests):
+    """
+    Template name -> seconds each render took while the test client ran
+    ``requests``, a list of (method, path, form data) tuples. A render is
+    render_template's call of the template with its context, or all of a
+    streamed one, so includes anything the template loads lazily.
+    """
+    env = app.jinja_env
+    times = defaultdict(list)
+
+    class TimedTemplate(env.template_class):
+        def render(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().render(*args, **kwargs)
+            finally:
+                times[self.name].append(time.perf_counter() - start)
+
+        def generate(self, *args, **kwargs):
+            # a streamed render, timed until its last piece
+            start = time.perf_counter()
+            try:
+                yield from super().generate(*args, **kwargs)
+            finally:
+                times[self.name].append(time.perf_counter() - start)
+
+    # templates are instances of the class they were loaded with
+    template_class, env.template_class = env.template_class, TimedTemplate
+    env.cache.clear()
+    try:
+        client = app.test_client()
+        for method, path, data in requests:
+            # buffered: a streamed page renders as its body is read
+            client.open(path, method=method, data=data, buffered=True)
+    finally:
+        env.template_class = template_class
+        env.cache.clear()
+    return times
+
+
+def report(app, requests, repeat=1):
+    """
+    (name, compile seconds, render count, median render seconds) rows,
+    slowest first; templates none of the requests rendered have None.
+    """
+    compiled = compile_times(app)
+    rendered = render_times(app, requests * repeat)
+    rows = []
+    for name in sorted(compiled):
+        renders = rendered.get(name, [])
+        rows.append((name, compiled[name], len(renders),
+                     statistics.median(renders) if renders else None))
+    rows.sort(key=lambda row: row[1] + (row[3] or 0), reverse=True)
+    return rows
+
+
+def init_app(app):
+    """
+    Keep compiled templates in the TEMPLATE_CACHE_DIR bytecode cache (the
+    instance folder by default) and, with TEMPLATE_WARMUP, load them all
+    now rather than on each template's first request.
+    """
+    if app.config.get('TEMPLATE_BYTECODE_CACHE', True):
+        directory = app.config.get('TEMPLATE_CACHE_DIR') or \
+            os.path.join(app.instance_path, 'jinja')
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = BytecodeCache(directory)
+    if app.config.get('TEMPLATE_WARMUP', False):
+        started = time.perf_counter()
+        count = warm(app)
+        app.logger.info('%d templates loaded in %.0fms', count,
+                        (time.perf_counter() - started) * 1e3)
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from app import create_app
+from models import db
+
+#----------------------------------------------------------------------------#
+# Fixtures.
+#----------------------------------------------------------------------------#
+
+# The tests write to the database, so they only run against the one named
+# by TEST_DATABASE_URL, migrated with `FYYUR_CONFIG=test flask db upgrade`.
+
+
+@pytest.fixture(scope='session')
+def app():
+    if not os.environ.get('TEST_DATABASE_URL'):
+        pytest.skip('TEST_DATABASE_URL is not set')
+    app = create_app('test')
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
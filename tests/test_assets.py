@@ -0,0 +1,72 @@
+import gzip
+
+import pytest
+from flask import Flask, url_for
+
+import assets
+from assets import minify_css
+
+
+def test_minify_css_keeps_selectors_and_declarations():
+    css = '''
+        /* links */
+        a:hover , a :hover { color : red ; }
+        p::before{ content: " a  b "; margin: 0 }
+        .nav > li  .dropdown { margin: 0 auto; }
+    '''
+    assert minify_css(css) == (
+        'a:hover,a :hover{color : red}'
+        'p::before{content: " a  b ";margin: 0}'
+        '.nav>li .dropdown{margin: 0 auto}')
+
+
+def test_minify_css_keeps_licence_comments():
+    css = '/*! licence */\n.a { margin: 0; }'
+    assert minify_css(css) == '/*! licence */\n.a{margin: 0}'
+
+
+@pytest.fixture
+def static_folder(tmp_path, monkeypatch):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'site.css').write_text('a { color: red; }\n' * 50)
+    (tmp_path / 'img').mkdir()
+    (tmp_path / 'img' / 'logo.jpg').write_bytes(b'not really a jpeg')
+    monkeypatch.setattr(assets, 'BUNDLES', {'site.css': ['css/site.css']})
+    monkeypatch.setattr(assets, 'FILES', ['img/*.jpg'])
+    return tmp_path
+
+
+def make_app(static_folder, bundled=True):
+    app = Flask(__name__, static_folder=str(static_folder),
+                static_url_path='/static')
+    app.config['ASSETS_BUNDLED'] = bundled
+    assets.init_app(app)
+    return app
+
+
+def test_static_urls_resolve_to_fingerprinted_files(static_folder):
+    manifest = assets.build(str(static_folder))
+    app = make_app(static_folder)
+    with app.test_request_context():
+        css = url_for('static', filename='site.css')
+        logo = url_for('static', filename='img/logo.jpg')
+        assert app.jinja_env.globals['asset_urls']('site.css') == [css]
+    assert css == f"/static/{manifest['site.css']['file']}"
+    assert logo == f"/static/{manifest['img/logo.jpg']['file']}"
+    assert css.startswith('/static/dist/site.') and css.endswith('.css')
+
+    client = app.test_client()
+    response = client.get(css, headers={'Accept-Encoding': 'gzip'})
+    assert response.content_encoding == 'gzip'
+    assert response.headers['Cache-Control'].endswith('immutable')
+    assert gzip.decompress(response.data) == \
+        (static_folder / manifest['site.css']['file']).read_bytes()
+
+
+def test_static_urls_without_a_build_are_the_sources(static_folder):
+    app = make_app(static_folder, bundled=False)
+    with app.test_request_context():
+        assert url_for('static', filename='img/logo.jpg') == \
+            '/static/img/logo.jpg'
+        assert app.jinja_env.globals['asset_urls']('site.css') == \
+            ['/static/css/site.css']
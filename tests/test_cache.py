@@ -0,0 +1,90 @@
+import itertools
+
+import pytest
+
+import cache
+from cache import CachedPage, LRUBackend, SQLiteBackend
+
+
+class Clock:
+    """time.time for the cache module, a second later at every call."""
+
+    def __init__(self):
+        self._seconds = itertools.count(1_000_000)
+
+    def time(self):
+        return float(next(self._seconds))
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    monkeypatch.setattr(cache, 'time', Clock())
+
+
+@pytest.fixture(params=['lru', 'sqlite'])
+def make_backend(request, tmp_path):
+    def make(max_entries=1024, max_bytes=64 * 1024 * 1024):
+        if request.param == 'lru':
+            return LRUBackend(max_entries, max_bytes)
+        return SQLiteBackend(str(tmp_path / 'cache.sqlite3'), max_entries,
+                             max_bytes)
+    return make
+
+
+def page(body=b'page'):
+    return CachedPage(body, 200, 'text/html')
+
+
+def put(backend, key, body=b'page', tags=()):
+    return backend.set(key, page(body), frozenset(tags), 300,
+                       backend.generation())
+
+
+def test_evicts_least_recently_read_past_max_entries(make_backend):
+    backend = make_backend(max_entries=2)
+    put(backend, 'a')
+    put(backend, 'b')
+    assert backend.get('a') is not None
+    put(backend, 'c')
+    assert backend.get('b') is None
+    assert backend.get('a') is not None and backend.get('c') is not None
+    assert len(backend) == 2
+    assert backend.evictions == 1
+
+
+def test_evicts_least_recently_read_past_max_bytes(make_backend):
+    backend = make_backend(max_bytes=10)
+    put(backend, 'a', b'1234')
+    put(backend, 'b', b'1234')
+    assert backend.get('a') is not None
+    put(backend, 'c', b'1234')
+    assert backend.get('b') is None
+    assert backend.get('a') is not None and backend.get('c') is not None
+    # a page over the limit on its own isn't kept
+    put(backend, 'd', b'12345678901')
+    assert len(backend) == 0
+
+
+def test_invalidate_drops_the_tagged_pages(make_backend):
+    backend = make_backend()
+    put(backend, 'venues', tags={'venues'})
+    put(backend, 'venue', tags={'venues', 'venue:1'})
+    put(backend, 'artists', tags={'artists'})
+    backend.invalidate(['venue:1'])
+    assert backend.get('venue') is None
+    assert backend.get('venues') is not None
+    backend.invalidate(['venues'])
+    assert backend.get('venues') is None
+    assert backend.get('artists') is not None
+
+
+def test_set_after_an_invalidation_is_refused(make_backend):
+    backend = make_backend()
+    generation = backend.generation()
+    # rendered from rows read before a write, stored after it invalidated
+    backend.invalidate(['venues'])
+    assert not backend.set('venues', page(), frozenset({'venues'}), 300,
+                           generation)
+    assert backend.get('venues') is None
+    assert put(backend, 'venues', tags={'venues'})
+    assert backend.get('venues') is not None
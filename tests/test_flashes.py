@@ -0,0 +1,57 @@
+import pytest
+
+from models import db, Venue, Artist
+
+PREFIX = 'Flash test'
+
+
+@pytest.fixture
+def venue(app):
+    venue = Venue(name=f'{PREFIX} venue', city='Austin', state='TX',
+                  address='1 Congress Ave', genres=['Jazz'])
+    db.session.add(venue)
+    db.session.commit()
+    yield venue.id
+    Venue.query.filter(Venue.name.startswith(PREFIX)).delete(
+        synchronize_session=False)
+    db.session.commit()
+
+
+@pytest.fixture
+def artist(app):
+    artist = Artist(name=f'{PREFIX} artist', city='Austin', state='TX',
+                    genres=['Jazz'])
+    db.session.add(artist)
+    db.session.commit()
+    yield artist.id
+    Artist.query.filter(Artist.name.startswith(PREFIX)).delete(
+        synchronize_session=False)
+    db.session.commit()
+
+
+def pages_after(client, path, data, message):
+    """How often ``message`` shows on the redirect target and after it."""
+    response = client.post(path, data=data, follow_redirects=True,
+                           buffered=True)
+    assert response.status_code == 200
+    bodies = [response.get_data(as_text=True)]
+    # streamed pages, then a plain one
+    for page in ('/shows', '/venues', '/'):
+        bodies.append(client.get(page, buffered=True).get_data(as_text=True))
+    return [body.count(message) for body in bodies]
+
+
+def test_venue_edit_flash_shows_once(client, venue):
+    data = {'name': f'{PREFIX} venue', 'city': 'Austin', 'state': 'TX',
+            'address': '1 Congress Ave', 'phone': '512-555-0100',
+            'genres': ['Jazz'], 'seeking_description': ''}
+    assert pages_after(client, f'/venues/{venue}/edit', data,
+                       'Venue successfully updated!') == [1, 0, 0, 0]
+
+
+def test_artist_edit_flash_shows_once(client, artist):
+    data = {'name': f'{PREFIX} artist', 'city': 'Austin', 'state': 'TX',
+            'phone': '512-555-0101', 'genres': ['Jazz'],
+            'seeking_description': ''}
+    assert pages_after(client, f'/artists/{artist}/edit', data,
+                       'Artist successfully updated!') == [1, 0, 0, 0]
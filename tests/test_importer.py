@@ -0,0 +1,48 @@
+import io
+import json
+
+import pytest
+
+from importer import import_rows, read_rows
+from models import db, Venue
+
+PREFIX = 'Import test'
+
+LINES = [
+    json.dumps({'name': f'{PREFIX} venue', 'city': 'Austin', 'state': 'TX',
+                'address': '1 Congress Ave', 'phone': '512-555-0100',
+                'genres': ['Jazz']}),
+    'null',
+    '[1]',
+    '3',
+    '"venue"',
+    '{"name": ',
+]
+
+
+@pytest.fixture
+def cleanup(app):
+    yield
+    Venue.query.filter(Venue.name.startswith(PREFIX)).delete(
+        synchronize_session=False)
+    db.session.commit()
+
+
+def test_read_rows_rejects_lines_that_are_not_objects():
+    rows = list(read_rows(io.StringIO('\n'.join(LINES) + '\n'), 'jsonl'))
+    assert [line for line, _ in rows] == [1, 2, 3, 4, 5, 6]
+    assert '_error' not in rows[0][1]
+    for (_, row), text in zip(rows[1:], LINES[1:]):
+        assert row['_raw'] == text
+        assert row['_error']
+
+
+def test_import_rows_reports_lines_that_are_not_objects(app, cleanup):
+    rejects = io.StringIO()
+    result = import_rows('venues',
+                         read_rows(io.StringIO('\n'.join(LINES)), 'jsonl'),
+                         rejects)
+    assert (result.imported, result.rejected) == (1, 5)
+    rejected = [json.loads(line) for line in rejects.getvalue().splitlines()]
+    assert [reject['line'] for reject in rejected] == [2, 3, 4, 5, 6]
+    assert rejected[0]['errors'] == {'row': ['Expected a JSON object']}
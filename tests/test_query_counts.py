@@ -0,0 +1,46 @@
+import pytest
+
+from instrumentation import assert_max_queries, record_queries
+from models import db, Venue
+
+# Venues seeded for the smaller run; the larger one has ten times as many.
+N = 20
+PREFIX = 'Query count test venue'
+
+
+def seed_venues(count, start=0):
+    db.session.add_all([
+        Venue(name=f'{PREFIX} {number}', city=f'City {number % 7}',
+              state='CA', address=f'{number} Main St', phone='555-0100',
+              genres=['Jazz', 'Blues'][:number % 2 + 1])
+        for number in range(start, start + count)])
+    db.session.commit()
+
+
+@pytest.fixture
+def seeded(app):
+    yield seed_venues
+    Venue.query.filter(Venue.name.startswith(PREFIX)).delete(
+        synchronize_session=False)
+    db.session.commit()
+
+
+def statements(client, path):
+    with record_queries() as queries:
+        response = client.get(path, buffered=True)
+    assert response.status_code == 200
+    return queries.count
+
+
+@pytest.mark.parametrize('path', [
+    '/venues?limit=200',
+    '/venues?limit=200&state=CA&genre=Jazz',
+])
+def test_venues_statements_do_not_grow_with_venues(client, seeded, path):
+    seeded(N)
+    few = statements(client, path)
+    seeded(9 * N, start=N)
+    many = statements(client, path)
+    assert few == many
+    with assert_max_queries(3, repeated=1):
+        client.get(path, buffered=True)
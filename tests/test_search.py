@@ -0,0 +1,31 @@
+import pytest
+
+import search
+from models import db, Artist
+
+PREFIX = 'Zq search test'
+
+
+@pytest.fixture
+def artists(app):
+    rows = [Artist(name=name, city='Austin', state='TX', genres=['Jazz'])
+            for name in (f'{PREFIX} one', f'{PREFIX}_two', 'Band Zq')]
+    db.session.add_all(rows)
+    db.session.commit()
+    yield {row.name: row.id for row in rows}
+    Artist.query.filter(Artist.id.in_([row.id for row in rows])).delete(
+        synchronize_session=False)
+    db.session.commit()
+
+
+def test_short_terms_match_name_prefixes(artists):
+    found = {row.id for row in search.search_artists('zQ', 100)}
+    assert artists[f'{PREFIX} one'] in found
+    assert artists[f'{PREFIX}_two'] in found
+    # inside a name is left to terms long enough for the trigram indexes
+    assert artists['Band Zq'] not in found
+
+
+def test_short_terms_are_not_patterns(artists):
+    assert search.search_artists('_q', 100) == []
+    assert search.search_artists('%', 100) == []
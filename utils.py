@@ -1,5 +1,7 @@
 import re
 
+PHONE = re.compile(r'^\(?([0-9]{3})\)?[-. ]?([0-9]{3})[-. ]?([0-9]{4})$')
+
 
 def is_valid_phone(number):
     """ Validate phone numbers like:
@@ -15,5 +17,4 @@ def is_valid_phone(number):
 
     Note: (? = optional) - Learn more: https://regex101.com/
     """
-    regex = re.compile('^\(?([0-9]{3})\)?[-. ]?([0-9]{3})[-. ]?([0-9]{4})$')
-    return regex.match(number)
+    return PHONE.match(number)
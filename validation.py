@@ -0,0 +1,117 @@
+import ipaddress
+import re
+from functools import lru_cache
+
+from enums import Genre, State
+from utils import PHONE
+
+#----------------------------------------------------------------------------#
+# Record validation.
+#----------------------------------------------------------------------------#
+
+GENRES = frozenset(genre.name for genre in Genre)
+STATES = frozenset(state.name for state in State)
+
+# WTForms' URL(): a scheme, a hostname with a TLD (or an IP address) and
+# an optional port, path and query.
+URL = re.compile(r'^[a-z]+://(?P<host>[^\/\?:]+)(?P<port>:[0-9]+)?'
+                 r'(?P<path>\/.*?)?(?P<query>\?.*)?$', re.IGNORECASE)
+HOSTNAME_PART = re.compile(r'^(xn-|[a-z0-9_]+)(-[a-z0-9_]+)*$', re.IGNORECASE)
+TLD = re.compile(r'^([a-z]{2,20}|xn--([a-z0-9]+-)*[a-z0-9]+)$', re.IGNORECASE)
+
+REQUIRED = 'This field is required.'
+INVALID_CHOICE = 'Not a valid choice'
+INVALID_PHONE = 'Invalid phone.'
+INVALID_URL = 'Invalid URL.'
+
+
+@lru_cache(maxsize=4096)
+def is_hostname(host):
+    """A dotted hostname with a TLD, or an IP address."""
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        pass
+    if not host.isascii():
+        try:
+            host = host.encode('idna').decode('ascii')
+        except UnicodeError:
+            return False
+    if len(host) > 253:
+        return False
+    parts = host.split('.')
+    return len(parts) > 1 and TLD.match(parts[-1]) is not None and all(
+        part and len(part) <= 63 and HOSTNAME_PART.match(part)
+        for part in parts)
+
+
+def is_url(value):
+    match = URL.match(value)
+    return match is not None and is_hostname(match.group('host'))
+
+
+def _blank(value):
+    return not value or (isinstance(value, str) and not value.strip())
+
+
+class Rules:
+    """
+    The checks a venue or artist record must pass, over plain dicts of
+    field values: a form's ``data``, an import row or a JSON body.
+    Genres and state are enum names; optional fields may be missing.
+    """
+
+    def __init__(self, fields, required, urls, booleans):
+        self.fields = tuple(fields)
+        self.required = tuple(required)
+        self.urls = tuple(urls)
+        self.booleans = frozenset(booleans)
+
+    def errors(self, record):
+        """Field name -> error messages; empty if ``record`` is valid."""
+        errors = {}
+        for name in self.required:
+            if _blank(record.get(name)):
+                errors[name] = [REQUIRED]
+
+        state = record.get('state')
+        if state and state not in STATES:
+            errors.setdefault('state', []).append(INVALID_CHOICE)
+        genres = record.get('genres')
+        if genres and not GENRES.issuperset(genres):
+            errors.setdefault('genres', []).extend(
+                f"'{genre}' is not a valid choice for this field"
+                for genre in genres if genre not in GENRES)
+
+        phone = record.get('phone')
+        if phone and not PHONE.match(phone):
+            errors['phone'] = [INVALID_PHONE]
+        for name in self.urls:
+            value = record.get(name)
+            if not _blank(value) and not is_url(value):
+                errors[name] = [INVALID_URL]
+        return errors
+
+    def validate(self, records):
+        """Error maps of a list or stream of records, lazily and in order."""
+        return map(self.errors, records)
+
+
+VENUE_RULES = Rules(
+    fields=['name', 'city', 'state', 'address', 'phone', 'genres',
+            'image_link', 'facebook_link', 'website_link', 'seeking_talent',
+            'seeking_description'],
+    required=['name', 'city', 'state', 'address', 'genres'],
+    urls=['image_link', 'facebook_link', 'website_link'],
+    booleans=['seeking_talent'],
+)
+
+ARTIST_RULES = Rules(
+    fields=['name', 'city', 'state', 'phone', 'image_link', 'genres',
+            'facebook_link', 'website_link', 'seeking_venue',
+            'seeking_description'],
+    required=['name', 'city', 'state', 'genres'],
+    urls=['image_link', 'facebook_link', 'website_link'],
+    booleans=['seeking_venue'],
+)
@@ -0,0 +1,210 @@
+import sys
+
+from flask import (Blueprint, abort, flash, jsonify, redirect,
+                   render_template, request, url_for)
+
+from cache import add_cache_tags, page_cache
+from facets import InvalidFilter, parse_filters
+from models import db, Venue, Show
+from pagination import InvalidCursor
+from queries import venue_areas, venue_detail
+from templating import stream_template
+from views import browse_facets, page_args, tagged_shows
+import loading
+import lookups
+import routing
+import search
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+# The form views import forms (and with it WTForms) when first called, so
+# starting a worker or a CLI command doesn't.
+blueprint = Blueprint('venues', __name__)
+
+
+@blueprint.route('/venues')
+@page_cache.cached('venues')
+def venues():
+    # browse by ?genre=&state=&city=, with counts for each facet value
+    try:
+        filters = parse_filters(request.args)
+        page = venue_areas(**page_args(), filters=filters)
+    except (InvalidCursor, InvalidFilter):
+        abort(400)
+    add_cache_tags(*(f"venue:{venue['id']}"
+                     for area in page for venue in area['venues']))
+    return render_template('pages/venues.html', areas=page, page=page,
+                           facets=browse_facets(Venue, filters))
+
+
+#  Search Venue
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/venues/search', methods=['POST'])
+@routing.read_only
+def search_venues():
+    """
+    ranked, case-insensitive fuzzy search on venue name, city and genre.
+    """
+    query = request.form.get('search_term', '')
+    result = search.search_venues(query, request.form.get('limit'))
+
+    response = {
+        "count": len(result),
+        "data": result
+    }
+    return render_template(
+        'pages/search_venues.html',
+        results=response, search_term=query
+    )
+
+
+@blueprint.route('/venues/typeahead')
+def typeahead_venues():
+    result = search.search_venues(request.args.get('q', ''),
+                                  request.args.get('limit'))
+    return jsonify(search.typeahead_response(result))
+
+
+@blueprint.route('/venues/choices')
+def venue_choices():
+    return jsonify(lookups.choices_response(lookups.venues.search(
+        request.args.get('q'), search.clamp_limit(request.args.get('limit')))))
+
+
+@blueprint.route('/venues/<int:venue_id>')
+@page_cache.cached('venue:{venue_id}')
+def show_venue(venue_id):
+    venue = venue_detail(venue_id)
+    if venue is None:
+        abort(404)
+    for shows in ("upcoming_shows", "past_shows"):
+        venue[shows] = tagged_shows(venue[shows], 'artist')
+
+    return stream_template('pages/show_venue.html', venue=venue)
+
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    from forms import VenueForm
+
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@blueprint.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    from forms import VenueForm
+
+    form = VenueForm(request.form)
+    try:
+        if form.validate():
+            form_data = form.data
+            form_data.pop('csrf_token', None)
+            venue = Venue(**form_data)
+            db.session.add(venue)
+            db.session.commit()
+            page_cache.invalidate('venues')
+            lookups.venues.invalidate()
+            flash("Venue was successfully created!")
+        else:
+            print("errors: ", form.errors)
+            flash("Form validation failed. Venue could not be created")
+            return render_template('forms/new_venue.html', form=form)
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+        flash('An error occurred. Venue could not be created.')
+        return render_template('forms/new_venue.html', form=form)
+    finally:
+        db.session.close()
+    return redirect(url_for('.venues'))
+
+
+@blueprint.route('/venues/<venue_id>', methods=['POST'])
+def delete_venue(venue_id):
+    try:
+        shows_count = Show.query.filter_by(venue_id=venue_id).count()
+        # a venue with one show is deleted with it (cascade), so only then
+        # is that show loaded
+        venue = Venue.query.options(*loading.profile(
+            Venue, 'bare' if shows_count > 1 else 'with_shows'
+        )).get_or_404(venue_id)
+
+        if (shows_count > 1):
+            flash(
+                f"Venue ({venue.name}) can't be deleted, {shows_count} shows linked"
+            )
+            return redirect(url_for('.show_venue', venue_id=venue_id))
+        db.session.delete(venue)
+        db.session.commit()
+        page_cache.invalidate('venues', f"venue:{venue_id}")
+        lookups.venues.invalidate()
+        flash(f"Venue ({venue.name}) deleted successfully ")
+    except Exception as ex:
+        print(str(ex))
+        db.session.rollback()
+        flash(f"Venue ({venue.name}) deletion failed")
+    finally:
+        db.session.close()
+
+    # BONUS CHALLENGE (Done): Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    return redirect(url_for('index'))
+
+
+#  Edit Venue
+#  ----------------------------------------------------------------
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@routing.read_primary
+def edit_venue(venue_id):
+    from forms import VenueForm
+
+    try:
+        venue = Venue.query.options(
+            *loading.profile(Venue, 'bare')).get_or_404(venue_id)
+        form = VenueForm(obj=venue)
+        return render_template('forms/edit_venue.html', form=form, venue=venue)
+    except:
+        flash(f"Venue ({venue.id}) failed to fetch")
+    return None
+
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    from forms import VenueForm
+
+    form = VenueForm(request.form)
+    try:
+        if form.validate():
+            form_data = form.data
+            form_data.pop('csrf_token', None)
+            venue = db.session.query(Venue).filter_by(id=venue_id)
+
+            if not venue.first():
+                abort(404)
+            venue.update(form_data)
+
+            db.session.commit()
+            page_cache.invalidate('venues', f"venue:{venue_id}")
+            lookups.venues.invalidate()
+            flash("Venue successfully updated!")
+        else:
+            print("errors: ", form.errors)
+            flash("Form validation failed .Venue could not be updated")
+            return render_template('forms/new_venue.html', form=form)
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+        flash('An error occurred. Venue could not be updated.')
+        return render_template('forms/new_venue.html', form=form)
+    finally:
+        db.session.close()
+    return redirect(url_for('.show_venue', venue_id=venue_id))
@@ -0,0 +1,52 @@
+from flask import request, url_for
+
+from cache import add_cache_tags
+from facets import facet_links, unfiltered_counts
+from models import db
+from pagination import page_size
+
+#----------------------------------------------------------------------------#
+# Helpers shared by the page blueprints.
+#----------------------------------------------------------------------------#
+
+
+def page_args():
+    """Keyset pagination arguments (?after=, ?before=, ?limit=)."""
+    return {
+        "after": request.args.get('after'),
+        "before": request.args.get('before'),
+        "limit": page_size(request.args.get('limit')),
+    }
+
+
+def url_with_args(**changes):
+    """
+    The current URL with query arguments replaced (None drops one); the
+    page cursor is always dropped, so links start from the first page
+    unless they set one.
+    """
+    args = request.args.to_dict(flat=False)
+    args.pop('after', None)
+    args.pop('before', None)
+    for name, value in changes.items():
+        if value is None:
+            args.pop(name, None)
+        else:
+            args[name] = value
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def browse_facets(model, filters):
+    """Facet counts for a listing, as links toggling each value."""
+    return facet_links(unfiltered_counts.get(db.session, model, filters),
+                       filters, url_with_args)
+
+
+def tagged_shows(shows, other):
+    """
+    Pass ``shows`` through as the page renders them, tagging it with the
+    ``other`` ('venue' or 'artist') each one is at or by.
+    """
+    for show in shows:
+        add_cache_tags(f"{other}:{show[f'{other}_id']}")
+        yield show